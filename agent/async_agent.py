@@ -0,0 +1,155 @@
+# agent/async_agent.py
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class AsyncAgent:
+    """
+    asyncio counterpart of SimpleAgent that coalesces concurrent calls.
+
+    observe() and ask() only queue a request and await its future. One
+    flusher task drains the queue in batches of up to `max_batch`: a run
+    of consecutive observations becomes a single memory.add_many(), and a
+    run of consecutive asks at the same current_time a single
+    memory.retrieve_many(), so an embedding memory encodes the whole run
+    in one model call. The memory calls go through its async methods,
+    which run them on the memory's executor and keep the event loop free.
+
+    Requests are applied in the order they were made, and add_many /
+    retrieve_many match one-at-a-time calls, so answers are the same as
+    SimpleAgent would give for that order. Asks without a current_time
+    are answered at the time their batch runs.
+
+    While a batch is running, new requests pile up for the next one; with
+    `max_wait` > 0 the flusher also waits that many seconds before
+    draining a batch that is not full yet.
+
+    Args:
+        memory: Any BaseMemory
+        max_batch: Requests drained per batch
+        max_wait: Seconds to let a partial batch fill up
+    """
+
+    OBSERVE, ASK = "observe", "ask"
+
+    def __init__(self, memory, max_batch: int = 64, max_wait: float = 0.0):
+        if max_batch < 1:
+            raise ValueError("max_batch must be >= 1")
+        self.memory = memory
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        # (kind, payload, current_time, future); payload is a list of
+        # memory items for OBSERVE and of queries for ASK
+        self._queue: List[Tuple[str, List[Any], Optional[float], asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self.requests = 0
+        self.batches = 0
+        self.memory_calls = 0
+
+    async def observe(self, content: str, impact: float, current_time: Optional[float] = None):
+        if current_time is None:
+            current_time = time.time()
+        await self._submit(self.OBSERVE, [{"content": content, "timestamp": current_time, "impact": impact}])
+
+    async def observe_many(
+        self,
+        contents: Sequence[str],
+        impacts: Sequence[float],
+        current_times: Optional[Sequence[float]] = None,
+    ):
+        if current_times is None:
+            current_times = [time.time()] * len(contents)
+
+        memory_items: List[Dict[str, Any]] = [
+            {"content": content, "timestamp": current_time, "impact": impact}
+            for content, impact, current_time in zip(contents, impacts, current_times)
+        ]
+        await self._submit(self.OBSERVE, memory_items)
+
+    async def ask(self, query: str, current_time: Optional[float] = None) -> Optional[str]:
+        return (await self._submit(self.ASK, [query], current_time))[0]
+
+    async def ask_many(self, queries: Sequence[str], current_time: Optional[float] = None) -> List[Optional[str]]:
+        return await self._submit(self.ASK, list(queries), current_time)
+
+    def _submit(self, kind: str, payload: List[Any], current_time: Optional[float] = None) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((kind, payload, current_time, future))
+        self.requests += 1
+        if self._flusher is None:
+            self._flusher = loop.create_task(self._flush_loop())
+        return future
+
+    async def _flush_loop(self):
+        try:
+            while self._queue:
+                if len(self._queue) < self.max_batch:
+                    # Let the coroutines that are ready now join this batch
+                    await asyncio.sleep(self.max_wait)
+                batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+                await self._run(batch)
+        finally:
+            self._flusher = None
+
+    async def _run(self, batch):
+        self.batches += 1
+        start = 0
+        while start < len(batch):
+            kind, _, current_time, _ = batch[start]
+            end = start + 1
+            # Observations always merge; asks merge at an equal current_time
+            while end < len(batch) and batch[end][0] == kind and (
+                kind == self.OBSERVE or batch[end][2] == current_time
+            ):
+                end += 1
+            run = batch[start:end]
+            start = end
+
+            payload = [entry for _, entries, _, _ in run for entry in entries]
+            self.memory_calls += 1
+            try:
+                if kind == self.OBSERVE:
+                    await self.memory.aadd_many(payload)
+                    await self._maybe_compact()
+                    answers = [None] * len(run)
+                else:
+                    if current_time is None:
+                        current_time = time.time()
+                    results = await self.memory.aretrieve_many(payload, current_time=current_time)
+                    contents = [r[0]["content"] if r else None for r in results]
+                    answers, offset = [], 0
+                    for _, queries, _, _ in run:
+                        answers.append(contents[offset:offset + len(queries)])
+                        offset += len(queries)
+            except Exception as exc:
+                for _, _, _, future in run:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, _, _, future), answer in zip(run, answers):
+                if not future.done():
+                    future.set_result(answer)
+
+    async def _maybe_compact(self):
+        # Runs on the memory's executor, between memory operations
+        wal = getattr(self.memory, "wal", None)
+        if wal is not None:
+            await asyncio.get_running_loop().run_in_executor(self.memory.executor, wal.maybe_compact)
+
+    async def drain(self):
+        """Wait until every queued request has been answered."""
+        while self._flusher is not None:
+            await asyncio.shield(self._flusher)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "memory_calls": self.memory_calls,
+            "requests_per_call": self.requests / self.memory_calls if self.memory_calls else 0.0,
+            "queued": len(self._queue),
+        }
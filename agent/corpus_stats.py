@@ -0,0 +1,93 @@
+# agent/corpus_stats.py
+
+import math
+from typing import Dict, List, Optional
+
+from memory.sketch import CountMinSketch
+
+
+class CorpusStats:
+    """
+    Streaming document-frequency statistics for TF-IDF scoring.
+
+    Every observed line is one document; each distinct token in it bumps
+    that token's document frequency in a count-min sketch, so memory stays
+    at depth * width counters however large the vocabulary grows. The
+    sketch can only overestimate a frequency, which makes a token look
+    more common (less rare) than it is, never rarer.
+
+    With `half_life` set, the document count and every frequency are
+    halved each time that many documents have been observed, so rarity
+    follows recent traffic instead of the whole history.
+
+    Args:
+        width: Sketch counters per row
+        depth: Sketch rows
+        half_life: Documents between halvings (None = never age)
+        seed: Sketch hash salt
+    """
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4, half_life: Optional[int] = None, seed: int = 0):
+        if half_life is not None and half_life < 1:
+            raise ValueError("half_life must be >= 1")
+        self.sketch = CountMinSketch(width=width, depth=depth, seed=seed)
+        self.half_life = half_life
+        self.documents = 0
+        self._since_halving = 0
+
+    def observe(self, tokens: List[str]):
+        """Count one document made of `tokens`."""
+        sketch = self.sketch
+        for token in set(tokens):
+            sketch.add_cells(sketch.cells(token))
+        self._count_document()
+
+    def _count_document(self):
+        self.documents += 1
+        if self.half_life is not None:
+            self._since_halving += 1
+            if self._since_halving >= self.half_life:
+                self.sketch.halve()
+                self.documents //= 2
+                self._since_halving = 0
+
+    def idf(self, token: str) -> float:
+        return math.log((self.documents + 1) / (self.sketch.estimate(token) + 1))
+
+    def rarity(self, tokens: List[str]) -> float:
+        """
+        Mean smoothed IDF of the tokens (repeats weighted by term
+        frequency), divided by the IDF of a never-seen token, so the
+        result is in [0, 1]. Before any document is observed every
+        token is unseen and the rarity is 1.0.
+        """
+        return self._rarity(tokens, observe=False)
+
+    def update(self, tokens: List[str]) -> float:
+        """rarity(tokens), then observe(tokens), hashing each token once."""
+        return self._rarity(tokens, observe=True)
+
+    def _rarity(self, tokens: List[str], observe: bool) -> float:
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        sketch = self.sketch
+        n = self.documents + 1
+        weighted_idf = 0.0
+        for token, count in counts.items():
+            cells = sketch.cells(token)
+            weighted_idf += count * math.log(n / (sketch.estimate_cells(cells) + 1))
+            if observe:
+                sketch.add_cells(cells)
+        if observe:
+            self._count_document()
+
+        if not tokens:
+            return 0.0
+        max_idf = math.log(n)
+        if max_idf == 0.0:
+            return 1.0
+        return min(1.0, max(0.0, weighted_idf / (len(tokens) * max_idf)))
+
+    def stats(self) -> Dict[str, float]:
+        return {"documents": self.documents, "sketch": self.sketch.stats()}
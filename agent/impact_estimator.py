@@ -3,16 +3,163 @@ Automatic impact estimation without manual labeling.
 
 Provides multiple strategies:
 1. Rule-based: Keywords indicating importance (policy, security, alert, etc.)
-2. TF-IDF based: Rarity of words
+2. TF-IDF based: Rarity of words (per line, or against streaming CorpusStats)
 3. Random: Baseline (no signal)
 """
 
 import re
-from typing import Callable
+from collections import OrderedDict
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agent.corpus_stats import CorpusStats
+
+
+_TOKEN = re.compile(r'\b\w+\b')
+
+# Keyword tiers, as bit flags so one lookup answers every tier at once
+_CRITICAL, _CONFIG, _ACTION, _SEVERE, _WARNING, _INFO = 1, 2, 4, 8, 16, 32
+
+CRITICAL_KEYWORDS = (
+    "policy", "security", "alert", "error", "critical", "compliance",
+    "access", "permission", "fail", "failure", "breach", "unauthorized",
+    "confidential", "secret", "credential", "password", "api.key"
+)
+CONFIG_KEYWORDS = (
+    "config", "setting", "limit", "threshold", "parameter",
+    "quota", "tier", "retention", "rate", "timeout"
+)
+ACTION_KEYWORDS = (
+    "update", "change", "modify", "create", "delete", "remove",
+    "grant", "revoke", "enable", "disable"
+)
+SEVERE_KEYWORDS = ("error", "critical", "fatal", "exception")
+
+
+def _compile_keywords() -> Tuple[Dict[str, int], Tuple[Tuple[str, int], ...]]:
+    flags: Dict[str, int] = {}
+    for keywords, flag in (
+        (CRITICAL_KEYWORDS, _CRITICAL),
+        (CONFIG_KEYWORDS, _CONFIG),
+        (ACTION_KEYWORDS, _ACTION),
+        (SEVERE_KEYWORDS, _SEVERE),
+        (("warning",), _WARNING),
+        (("info",), _INFO),
+    ):
+        for kw in keywords:
+            flags[kw] = flags.get(kw, 0) | flag
+    # A keyword made only of word characters can only occur inside a single
+    # \w+ token; the rest ("api.key") are checked against the whole text
+    word_keywords = {kw: f for kw, f in flags.items() if _TOKEN.fullmatch(kw)}
+    other_keywords = tuple((kw, f) for kw, f in flags.items() if kw not in word_keywords)
+    return word_keywords, other_keywords
+
+
+_WORD_KEYWORDS, _OTHER_KEYWORDS = _compile_keywords()
+# (keywords, score) per tier, highest score first, for the single-score
+# estimators: they stop at the first keyword found
+_RULE_TIERS = ((CRITICAL_KEYWORDS, 1.0), (CONFIG_KEYWORDS, 0.7), (ACTION_KEYWORDS, 0.3))
+_SEVERITY_TIERS = ((SEVERE_KEYWORDS, 1.0), (("warning",), 0.7), (("info",), 0.3))
+_token_flags: Dict[str, int] = {}
+_TOKEN_FLAGS_MAX = 100_000
+
+
+def _flags_of(token: str) -> int:
+    flags = 0
+    for kw, flag in _WORD_KEYWORDS.items():
+        if kw in token:
+            flags |= flag
+    if len(_token_flags) >= _TOKEN_FLAGS_MAX:
+        _token_flags.clear()
+    _token_flags[token] = flags
+    return flags
+
+
+def _tier_score(text_lower: str, tiers) -> float:
+    """Score of the first tier with a keyword in `text_lower`, else 0.1."""
+    for keywords, score in tiers:
+        for kw in keywords:
+            if kw in text_lower:
+                return score
+    return 0.1
+
+
+def _analyze(text: str) -> Tuple[int, List[str]]:
+    """
+    Lowercase and tokenize `text` once; return the keyword flags of every
+    tier and the tokens. When the tokens are needed anyway, flags are
+    looked up per distinct token (memoized), so each token is matched
+    against the keyword table only the first time it is seen. The flags
+    give the same scores as the per-tier scans of rule_based and
+    severity_based.
+    """
+    text_lower = text.lower()
+    tokens = _TOKEN.findall(text_lower)
+    flags = 0
+    get = _token_flags.get
+    for token in tokens:
+        f = get(token)
+        flags |= f if f is not None else _flags_of(token)
+    for kw, flag in _OTHER_KEYWORDS:
+        if kw in text_lower:
+            flags |= flag
+    return flags, tokens
+
+
+def _rule_score(flags: int) -> float:
+    if flags & _CRITICAL:
+        return 1.0
+    if flags & _CONFIG:
+        return 0.7
+    if flags & _ACTION:
+        return 0.3
+    return 0.1
+
+
+def _severity_score(flags: int) -> float:
+    if flags & _SEVERE:
+        return 1.0
+    if flags & _WARNING:
+        return 0.7
+    if flags & _INFO:
+        return 0.3
+    return 0.1
+
+
+def _tfidf_score(tokens: List[str]) -> float:
+    unique_tokens = len(set(tokens))
+    total_tokens = len(tokens)
+
+    if total_tokens == 0:
+        return 0.1
+
+    # Uniqueness ratio
+    uniqueness = unique_tokens / total_tokens
+
+    # Normalize to [0.1, 1.0] range
+    # More unique tokens -> higher impact (less repetitive, more signal)
+    impact = 0.1 + (uniqueness * 0.9)
+
+    return min(1.0, impact)
+
+
+def _streaming_tfidf_score(tokens: List[str], corpus_stats: CorpusStats) -> float:
+    # Score against the lines seen so far, then count this line
+    if not tokens:
+        return 0.1
+    return 0.1 + corpus_stats.update(tokens) * 0.9
 
 
 class ImpactEstimator:
-    """Estimates importance of text without manual labels."""
+    """
+    Estimates importance of text without manual labels.
+
+    The keyword tiers are built once at import. rule_based() and
+    severity_based() scan their own tiers in score order and stop at the
+    first keyword found. combined() lowercases and tokenizes each text once
+    and looks up every tier's flags per distinct token, sharing the result
+    across the rule, severity and tfidf scores.
+    """
     
     @staticmethod
     def rule_based(text: str) -> float:
@@ -25,41 +172,7 @@ class ImpactEstimator:
             0.3 if contains action keywords (update, change, create, delete)
             0.1 otherwise (generic logs, chat, debug)
         """
-        text_lower = text.lower()
-        
-        # Critical keywords
-        critical_keywords = [
-            "policy", "security", "alert", "error", "critical", "compliance",
-            "access", "permission", "fail", "failure", "breach", "unauthorized",
-            "confidential", "secret", "credential", "password", "api.key"
-        ]
-        
-        # Config keywords
-        config_keywords = [
-            "config", "setting", "limit", "threshold", "parameter",
-            "quota", "tier", "retention", "rate", "timeout"
-        ]
-        
-        # Action keywords
-        action_keywords = [
-            "update", "change", "modify", "create", "delete", "remove",
-            "grant", "revoke", "enable", "disable"
-        ]
-        
-        # Check for critical
-        if any(kw in text_lower for kw in critical_keywords):
-            return 1.0
-        
-        # Check for config
-        if any(kw in text_lower for kw in config_keywords):
-            return 0.7
-        
-        # Check for action
-        if any(kw in text_lower for kw in action_keywords):
-            return 0.3
-        
-        # Generic log
-        return 0.1
+        return _tier_score(text.lower(), _RULE_TIERS)
     
     @staticmethod
     def severity_based(text: str) -> float:
@@ -72,48 +185,33 @@ class ImpactEstimator:
             0.3 for INFO
             0.1 for DEBUG
         """
-        text_lower = text.lower()
-        
-        if any(x in text_lower for x in ["error", "critical", "fatal", "exception"]):
-            return 1.0
-        if "warning" in text_lower:
-            return 0.7
-        if "info" in text_lower:
-            return 0.3
-        
-        return 0.1
+        return _tier_score(text.lower(), _SEVERITY_TIERS)
     
     @staticmethod
-    def tfidf_based(text: str, corpus_stats: dict = None) -> float:
+    def tfidf_based(text: str, corpus_stats: Optional[CorpusStats] = None) -> float:
         """
         Estimate impact from TF-IDF rarity.
         
         Rare words indicate importance.
         Common words (the, a, is, etc.) are noise.
         
+        Without corpus_stats the score is the line's own token uniqueness
+        ratio. With a CorpusStats the score is the line's mean IDF against
+        every line scored before it, and the line is then added to the
+        statistics, so each call is O(tokens) and memory stays bounded.
+        
         Args:
             text: Text to estimate
-            corpus_stats: Precomputed corpus statistics (optional)
+            corpus_stats: Streaming corpus statistics (optional, updated in place)
             
         Returns:
             Score 0.1 to 1.0 based on rarity
         """
+        tokens = _TOKEN.findall(text.lower())
+        if corpus_stats is not None:
+            return _streaming_tfidf_score(tokens, corpus_stats)
         # Very basic: count unique tokens
-        tokens = re.findall(r'\b\w+\b', text.lower())
-        unique_tokens = len(set(tokens))
-        total_tokens = len(tokens)
-        
-        if total_tokens == 0:
-            return 0.1
-        
-        # Uniqueness ratio
-        uniqueness = unique_tokens / total_tokens
-        
-        # Normalize to [0.1, 1.0] range
-        # More unique tokens -> higher impact (less repetitive, more signal)
-        impact = 0.1 + (uniqueness * 0.9)
-        
-        return min(1.0, impact)
+        return _tfidf_score(tokens)
     
     @staticmethod
     def random_impact(text: str = None) -> float:
@@ -125,13 +223,17 @@ class ImpactEstimator:
         return random.uniform(0.1, 1.0)
     
     @staticmethod
-    def combined(text: str) -> float:
+    def combined(text: str, corpus_stats: Optional[CorpusStats] = None) -> float:
         """
         Combine multiple estimators with weights.
         """
-        rule_score = ImpactEstimator.rule_based(text)
-        severity_score = ImpactEstimator.severity_based(text)
-        tfidf_score = ImpactEstimator.tfidf_based(text)
+        flags, tokens = _analyze(text)
+        rule_score = _rule_score(flags)
+        severity_score = _severity_score(flags)
+        if corpus_stats is not None:
+            tfidf_score = _streaming_tfidf_score(tokens, corpus_stats)
+        else:
+            tfidf_score = _tfidf_score(tokens)
         
         # Weighted average: rules are strongest signal
         combined = (0.6 * rule_score + 
@@ -139,14 +241,118 @@ class ImpactEstimator:
                    0.2 * tfidf_score)
         
         return combined
+    
+    @staticmethod
+    def combined_batch(texts: List[str], corpus_stats: Optional[CorpusStats] = None) -> List[float]:
+        """
+        combined() for a list of texts.
+        
+        Each distinct text is analyzed once (lowercase, tokenize, keyword
+        flags) and the result shared by the rule, severity and tfidf
+        scores; repeated log lines reuse the first computation. With
+        corpus_stats every line is scored and observed in order, since a
+        repeat is less rare than its first occurrence.
+        """
+        if corpus_stats is not None:
+            return [ImpactEstimator.combined(text, corpus_stats) for text in texts]
+        scores: Dict[str, float] = {}
+        out = []
+        for text in texts:
+            score = scores.get(text)
+            if score is None:
+                score = scores[text] = ImpactEstimator.combined(text)
+            out.append(score)
+        return out
+
+
+class MemoizedEstimator:
+    """
+    Caches an estimator's score per text template.
+    
+    Volatile tokens (quoted strings, hex ids and UUIDs, numbers) are
+    replaced by placeholders and the result lowercased, so
+    "Log: Connection established. [4521]" and "... [4522]" share one
+    template and the wrapped estimator runs once for both. The cache key
+    also holds what the built-in scores depend on that a template can
+    hide: the keyword flags of every tier ("User 'secret' ..." vs
+    "User 'bob' ...") and the token and distinct-token counts ("retry 5
+    of 5" vs "retry 4 of 5"). So rule, severity, tfidf and combined
+    scores are exact; don't wrap stateful estimators (random, streaming
+    tfidf). Keys live in a bounded LRU.
+    
+    Args:
+        estimator: Function from text to impact
+        max_entries: Maximum number of cached templates
+    """
+    
+    _VOLATILE = re.compile(
+        r"'[^'\n]*'|\"[^\"\n]*\""          # quoted ids
+        r"|\b\d[0-9a-fA-F.:-]*\b"          # numbers, times, digit-led hex / UUIDs
+        r"|\b\d[0-9.:]*"                    # numbers with a unit ("450ms")
+        r"|\b[a-fA-F]+\d[0-9a-fA-F-]*\b"   # letter-led hex ids
+    )
+    
+    def __init__(self, estimator: Callable[[str], float], max_entries: int = 10_000):
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.estimator = estimator
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[str, int, int, int], float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    @classmethod
+    def template(cls, text: str) -> str:
+        return cls._VOLATILE.sub("#", text).lower()
+    
+    @classmethod
+    def key(cls, text: str) -> Tuple[str, int, int, int]:
+        flags, tokens = _analyze(text)
+        return cls._VOLATILE.sub("#", text.lower()), flags, len(tokens), len(set(tokens))
+    
+    def __call__(self, text: str) -> float:
+        key = self.key(text)
+        score = self._cache.get(key)
+        if score is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return score
+        self.misses += 1
+        score = self._cache[key] = self.estimator(text)
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return score
+    
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def clear(self):
+        self._cache.clear()
+    
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self._cache),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
 
 
-def get_estimator(estimator_name: str) -> Callable[[str], float]:
+def get_estimator(
+    estimator_name: str,
+    corpus_stats: Optional[CorpusStats] = None,
+    memoize: bool = False,
+) -> Callable[[str], float]:
     """
     Factory function to get an impact estimator by name.
     
     Args:
         estimator_name: "rule", "severity", "tfidf", "random", or "combined"
+        corpus_stats: Streaming corpus statistics for "tfidf" and "combined"
+        memoize: Wrap the estimator in a MemoizedEstimator (template cache)
         
     Returns:
         Function that estimates impact from text
@@ -159,4 +365,9 @@ def get_estimator(estimator_name: str) -> Callable[[str], float]:
         "combined": ImpactEstimator.combined,
     }
     
-    return estimators.get(estimator_name, ImpactEstimator.rule_based)
+    if memoize and (estimator_name == "random" or corpus_stats is not None):
+        raise ValueError("memoize needs a deterministic estimator (no random, no corpus_stats)")
+    if corpus_stats is not None and estimator_name in ("tfidf", "combined"):
+        return partial(estimators[estimator_name], corpus_stats=corpus_stats)
+    estimator = estimators.get(estimator_name, ImpactEstimator.rule_based)
+    return MemoizedEstimator(estimator) if memoize else estimator
@@ -1,7 +1,7 @@
 # agent/simple_agent.py
 
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence
 
 
 class SimpleAgent:
@@ -18,6 +18,29 @@ class SimpleAgent:
             "impact": impact
         }
         self.memory.add(memory_item)
+        self._maybe_compact()
+
+    def observe_many(
+        self,
+        contents: Sequence[str],
+        impacts: Sequence[float],
+        current_times: Optional[Sequence[float]] = None,
+    ):
+        if current_times is None:
+            current_times = [time.time()] * len(contents)
+
+        memory_items: List[Dict[str, Any]] = [
+            {"content": content, "timestamp": current_time, "impact": impact}
+            for content, impact, current_time in zip(contents, impacts, current_times)
+        ]
+        self.memory.add_many(memory_items)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        # Between operations is the only safe point to snapshot the memory
+        wal = getattr(self.memory, "wal", None)
+        if wal is not None:
+            wal.maybe_compact()
 
     def ask(self, query: str, current_time: Optional[float] = None):
         if current_time is None:
@@ -25,3 +48,10 @@ class SimpleAgent:
         
         results = self.memory.retrieve(query, current_time=current_time)
         return results[0]["content"] if results else None
+
+    def ask_many(self, queries: Sequence[str], current_time: Optional[float] = None) -> List[Optional[str]]:
+        if current_time is None:
+            current_time = time.time()
+
+        results = self.memory.retrieve_many(list(queries), current_time=current_time)
+        return [r[0]["content"] if r else None for r in results]
@@ -122,10 +122,7 @@ def run_noise_experiment(memory_class, label, noise_type="friendly"):
         agent.observe(fact, impact=0.1, current_time=sim_time)
     
     # Final recall test
-    recalled = 0
-    for query in queries:
-        if agent.ask(query, current_time=sim_time):
-            recalled += 1
+    recalled = sum(1 for answer in agent.ask_many(queries, current_time=sim_time) if answer)
     
     recall_rate = recalled / len(queries)
     return recall_rate
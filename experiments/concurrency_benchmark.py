@@ -0,0 +1,135 @@
+"""
+Concurrency stress benchmark
+
+One writer thread keeps observing new log lines while N reader threads
+query the same memory, for N in READER_COUNTS. Compares:
+- Locked UWM: a UtilityWeightedMemory behind one global lock
+- Concurrent UWM: ConcurrentMemory (lock-free reads on a published view,
+  access counts applied in background batches)
+
+Reports reader and writer throughput and p99 read latency. Under CPython's
+GIL pure-Python work still runs one thread at a time, so the gain comes from
+readers no longer queueing behind each other and behind the writer, and
+from the NumPy sections that release the GIL.
+"""
+
+import sys
+import os
+import random
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memory.concurrent_memory import ConcurrentMemory
+from memory.utility_weighted_memory import UtilityWeightedMemory
+
+
+CAPACITY = 5_000
+DURATION = 2.0  # seconds per run
+READER_COUNTS = (1, 2, 4, 8)
+
+templates = [
+    "System Alert: Database latency exceeded {n}ms at 14:00.",
+    "User Config: Maximum retry attempts set to {n}.",
+    "Log: Connection established. [{n}]",
+    "Debug: Variable x{n} is null.",
+    "Security: Root access granted to user 'admin_{n}'.",
+]
+queries = ["latency", "retry", "connection", "variable", "root access", "admin_1"]
+
+
+class LockedMemory:
+    """Baseline: every call holds one global lock."""
+
+    def __init__(self, memory):
+        self.memory = memory
+        self._lock = threading.Lock()
+
+    def add(self, item):
+        with self._lock:
+            self.memory.add(item)
+
+    def retrieve(self, query, top_k=1, current_time=None):
+        with self._lock:
+            return self.memory.retrieve(query, top_k=top_k, current_time=current_time)
+
+
+def make_item(rng, t):
+    return {
+        "content": rng.choice(templates).format(n=rng.randrange(1000)),
+        "timestamp": t,
+        "impact": rng.random(),
+    }
+
+
+def run(memory, readers):
+    rng = random.Random(0)
+    for t in range(CAPACITY):
+        memory.add(make_item(rng, t))
+
+    stop = threading.Event()
+    clock = [float(CAPACITY)]
+    writes = [0]
+    latencies = [[] for _ in range(readers)]
+
+    def writer():
+        wrng = random.Random(1)
+        while not stop.is_set():
+            clock[0] += 1
+            memory.add(make_item(wrng, clock[0]))
+            writes[0] += 1
+
+    def reader(idx):
+        rrng = random.Random(100 + idx)
+        out = latencies[idx]
+        while not stop.is_set():
+            started = time.perf_counter()
+            memory.retrieve(rrng.choice(queries), top_k=3, current_time=clock[0])
+            out.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=writer)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    all_latencies = sorted(lat for per_reader in latencies for lat in per_reader)
+    p99 = all_latencies[int(0.99 * (len(all_latencies) - 1))] if all_latencies else 0.0
+    return {
+        "reads/s": len(all_latencies) / DURATION,
+        "writes/s": writes[0] / DURATION,
+        "p99 read (ms)": p99 * 1000,
+    }
+
+
+def main():
+    print("\n" + "="*60)
+    print("CONCURRENCY STRESS BENCHMARK")
+    print("="*60)
+    print(f"capacity={CAPACITY}, {DURATION:.0f}s per run, 1 writer thread\n")
+
+    variants = [
+        ("Locked UWM", lambda: LockedMemory(UtilityWeightedMemory(CAPACITY, eviction="heap", backend="columnar"))),
+        ("Concurrent UWM", lambda: ConcurrentMemory(UtilityWeightedMemory(CAPACITY, eviction="heap", backend="columnar"))),
+    ]
+    header = f"{'Strategy':<16} {'Readers':>7} {'reads/s':>10} {'writes/s':>10} {'p99 read (ms)':>14}"
+    print(header)
+    print("-" * len(header))
+    for label, make in variants:
+        for readers in READER_COUNTS:
+            memory = make()
+            result = run(memory, readers)
+            if isinstance(memory, ConcurrentMemory):
+                memory.close()
+            print(f"{label:<16} {readers:>7} {result['reads/s']:>10.0f} {result['writes/s']:>10.0f} "
+                  f"{result['p99 read (ms)']:>14.2f}")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
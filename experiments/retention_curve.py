@@ -68,10 +68,7 @@ def run_retention(memory_class, label, w_freq=None, w_impact=None):
         agent.observe(noise, impact=0.1, current_time=sim_time)
 
         # Test recall with simulated time so agents know memories are aging
-        recalled = 0
-        for query in queries:
-            if agent.ask(query, current_time=sim_time):
-                recalled += 1
+        recalled = sum(1 for answer in agent.ask_many(queries, current_time=sim_time) if answer)
 
         retention.append(recalled / len(queries))
 
@@ -109,6 +106,39 @@ def run_sensitivity_sweep():
     return impact_weights, final_retentions
 
 
+def run_sampling_gap(trials=20, sample_size=5):
+    """Compare sampled eviction with exact UWM eviction on the same streams."""
+    gaps, final_gaps, mismatch_rates = [], [], []
+
+    for trial in range(trials):
+        random.seed(trial)
+        exact_curve = run_retention(UtilityWeightedMemory, "UWM (exact)")
+
+        sampled = []
+
+        def sampled_memory(capacity):
+            memory = UtilityWeightedMemory(
+                capacity=capacity, eviction="sampled", sample_size=sample_size,
+                audit_eviction=True, seed=trial,
+            )
+            sampled.append(memory)
+            return memory
+
+        random.seed(trial)
+        sampled_curve = run_retention(sampled_memory, "UWM (sampled)")
+
+        gaps.append(sum(e - s for e, s in zip(exact_curve, sampled_curve)) / len(exact_curve))
+        final_gaps.append(exact_curve[-1] - sampled_curve[-1])
+        mismatch_rates.append(sampled[0].stats()["sampling"]["mismatch_rate"])
+
+    print(f"\n=== Sampled Eviction (sample_size={sample_size}, {trials} trials) ===")
+    print(f"  Victim differs from exact eviction: {sum(mismatch_rates) / trials:.2%} of evictions")
+    print(f"  Mean retention gap (exact - sampled): {sum(gaps) / trials:+.2%}")
+    print(f"  Final retention gap (exact - sampled): {sum(final_gaps) / trials:+.2%}")
+
+    return mismatch_rates, gaps
+
+
 if __name__ == "__main__":
     print("=== Retention Curves ===")
     fifo_curve = run_retention(FIFOMemory, "FIFO")
@@ -135,3 +165,6 @@ if __name__ == "__main__":
     # Run sensitivity analysis
     print("\n")
     impact_weights, final_retentions = run_sensitivity_sweep()
+
+    # Cost of approximating the eviction victim
+    run_sampling_gap()
@@ -0,0 +1,62 @@
+# memory/admission.py
+
+import re
+from typing import Dict, Optional
+
+from memory.sketch import CountMinSketch
+
+
+class TinyLFUAdmission:
+    """
+    TinyLFU-style admission filter for a full memory.
+
+    A count-min sketch remembers how often items of each content template
+    were accessed by retrieval; a template is the lowercased content with
+    every number replaced by "#", so "Log: Handshake successful. [17]" and
+    "... [18]" share one counter. When the memory is full, the owning
+    strategy asks admit() whether a candidate (its impact plus the
+    template's expected accesses) is worth more than the item it would
+    evict; if not, the insert is dropped before it touches the store.
+
+    Args:
+        width: Sketch counters per row
+        depth: Sketch rows
+        reset_after: Recorded accesses between sketch halvings, so
+            popularity ages out (None = never)
+        seed: Sketch hash salt
+    """
+
+    _NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+    def __init__(self, width: int = 4096, depth: int = 4, reset_after: Optional[int] = 10_000, seed: int = 0):
+        self.sketch = CountMinSketch(width=width, depth=depth, reset_after=reset_after, seed=seed)
+        self.admitted = 0
+        self.rejected = 0
+
+    @classmethod
+    def template(cls, content: str) -> str:
+        return cls._NUMBER.sub("#", content.lower())
+
+    def record(self, content: str, count: int = 1):
+        """Count `count` retrieval accesses to `content`'s template."""
+        self.sketch.add(self.template(content), count)
+
+    def frequency(self, content: str) -> int:
+        return self.sketch.estimate(self.template(content))
+
+    def admit(self, candidate_value: float, victim_value: float) -> bool:
+        """Admit only candidates strictly more valuable than the victim."""
+        if candidate_value > victim_value:
+            self.admitted += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def stats(self) -> Dict[str, float]:
+        decisions = self.admitted + self.rejected
+        return {
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "reject_rate": self.rejected / decisions if decisions else 0.0,
+            "sketch": self.sketch.stats(),
+        }
@@ -0,0 +1,127 @@
+# memory/ann_index.py
+
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index over unit vectors.
+
+    A spherical k-means pass learns `n_lists` coarse centroids; every stored
+    slot is filed under its nearest centroid. A query only scores the slots
+    in its `n_probe` nearest lists, so retrieval touches roughly
+    n_probe / n_lists of the memory. Inserts and deletes are O(n_lists * d)
+    and O(1), so the index keeps up with eviction.
+
+    The index only stores slot numbers; vectors stay in the owning memory's
+    matrix. Until `train_size` vectors have been seen the index is
+    untrained and callers should use the exact path.
+
+    Args:
+        n_lists: Number of coarse clusters
+        n_probe: Clusters scanned per query (n_probe == n_lists is exact)
+        train_size: Vectors required before training (default 8 * n_lists)
+        retrain_every: Retrain after this many inserts since the last
+            training, to follow drifting content (None = never)
+        kmeans_iters: Lloyd iterations per training run
+        seed: RNG seed for centroid initialisation
+    """
+
+    def __init__(
+        self,
+        n_lists: int = 64,
+        n_probe: int = 4,
+        train_size: Optional[int] = None,
+        retrain_every: Optional[int] = None,
+        kmeans_iters: int = 10,
+        seed: int = 0,
+    ):
+        if n_lists < 1 or n_probe < 1:
+            raise ValueError("n_lists and n_probe must be >= 1")
+        self.n_lists = n_lists
+        self.n_probe = min(n_probe, n_lists)
+        self.train_size = train_size if train_size is not None else 8 * n_lists
+        self.retrain_every = retrain_every
+        self.kmeans_iters = kmeans_iters
+        self._rng = np.random.default_rng(seed)
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[Set[int]] = []
+        self._assignment: Dict[int, int] = {}
+        self._inserts_since_train = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return len(self._assignment)
+
+    def needs_training(self, n_vectors: int) -> bool:
+        if not self.is_trained:
+            return n_vectors >= self.train_size
+        return self.retrain_every is not None and self._inserts_since_train >= self.retrain_every
+
+    def train(self, vectors: np.ndarray, slots: np.ndarray):
+        """Fit centroids on `vectors` (unit rows) and file every slot."""
+        n = vectors.shape[0]
+        n_lists = min(self.n_lists, n)
+        centroids = vectors[self._rng.choice(n, size=n_lists, replace=False)].astype(np.float32)
+        for _ in range(self.kmeans_iters):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = vectors[assign == c]
+                if len(members) == 0:
+                    # Re-seed empty clusters on a random vector
+                    centroids[c] = vectors[self._rng.integers(n)]
+                    continue
+                mean = members.sum(axis=0)
+                norm = np.linalg.norm(mean)
+                centroids[c] = mean / norm if norm > 0 else mean
+
+        self.centroids = centroids
+        self._lists = [set() for _ in range(n_lists)]
+        self._assignment = {}
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        for slot, c in zip(slots.tolist(), assign.tolist()):
+            self._lists[c].add(slot)
+            self._assignment[slot] = c
+        self._inserts_since_train = 0
+
+    def add(self, slot: int, vector: np.ndarray):
+        if not self.is_trained:
+            return
+        c = int(np.argmax(self.centroids @ vector))
+        self._lists[c].add(slot)
+        self._assignment[slot] = c
+        self._inserts_since_train += 1
+
+    def remove(self, slot: int):
+        c = self._assignment.pop(slot, None)
+        if c is not None:
+            self._lists[c].discard(slot)
+
+    def candidates(self, query: np.ndarray) -> np.ndarray:
+        """Slots filed under the n_probe centroids closest to `query`."""
+        sims = self.centroids @ query
+        n_probe = min(self.n_probe, len(self._lists))
+        probe = np.argpartition(-sims, n_probe - 1)[:n_probe]
+        total = sum(len(self._lists[c]) for c in probe)
+        out = np.empty(total, dtype=np.intp)
+        pos = 0
+        for c in probe:
+            members = self._lists[c]
+            out[pos:pos + len(members)] = list(members)
+            pos += len(members)
+        return out
+
+    def stats(self) -> Dict[str, float]:
+        sizes = [len(members) for members in self._lists]
+        return {
+            "n_lists": len(self._lists) if self.is_trained else self.n_lists,
+            "n_probe": self.n_probe,
+            "trained": self.is_trained,
+            "indexed": len(self._assignment),
+            "max_list_size": max(sizes) if sizes else 0,
+        }
@@ -1,21 +1,132 @@
 # memory/base_memory.py
 
+import asyncio
+import functools
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 
 
 class BaseMemory(ABC):
-    def __init__(self, capacity: int):
+    def __init__(self, capacity: int, low_watermark: Optional[int] = None):
+        # capacity is the high watermark. When an insert would exceed it the
+        # strategy evicts down to low_watermark in one batched pass; by
+        # default that is capacity itself, i.e. one eviction per insert.
+        if low_watermark is not None and not 0 <= low_watermark <= capacity:
+            raise ValueError("low_watermark must be between 0 and capacity")
         self.capacity = capacity
+        self.low_watermark = capacity if low_watermark is None else low_watermark
+        self._inserts = 0
+        self._evicted = 0
+        self._eviction_passes = 0
+        self._eviction_seconds = 0.0
+        # Optional memory.wal.WriteAheadLog that add / access / evict
+        # events are reported to
+        self.wal = None
+        # Created on the first async call; see executor
+        self._executor: Optional[Executor] = None
+
+    def _overflow(self, size: int) -> int:
+        """How many items to evict when the memory would hold `size` items."""
+        return size - self.low_watermark if size > self.capacity else 0
+
+    def _record_eviction(self, evicted: int, started: float):
+        self._evicted += evicted
+        self._eviction_passes += 1
+        self._eviction_seconds += time.perf_counter() - started
+
+    def eviction_cost(self) -> Dict[str, Any]:
+        return {
+            "inserts": self._inserts,
+            "evicted": self._evicted,
+            "passes": self._eviction_passes,
+            "amortized_ms": self._eviction_seconds * 1000 / self._inserts if self._inserts else 0.0,
+        }
+
+    def _cost_state(self) -> Dict[str, Any]:
+        return {
+            "inserts": self._inserts,
+            "evicted": self._evicted,
+            "eviction_passes": self._eviction_passes,
+            "eviction_seconds": self._eviction_seconds,
+        }
+
+    def _restore_cost_state(self, state: Dict[str, Any]):
+        self._inserts = state["inserts"]
+        self._evicted = state["evicted"]
+        self._eviction_passes = state["eviction_passes"]
+        self._eviction_seconds = state["eviction_seconds"]
+
+    def _snapshot(self):
+        # (config, state, arrays) for memory.snapshot.save_snapshot; config
+        # holds the constructor arguments, state the JSON scalars, arrays the
+        # columns. Strategies that can be snapshotted override this and
+        # _from_snapshot.
+        raise NotImplementedError(f"{type(self).__name__} does not support snapshots")
+
+    def _replay(self, op: int, key: Any, time: float, memory: Optional[Dict[str, Any]]):
+        # Re-apply one WriteAheadLog event (ADD / ACCESS / EVICT) directly
+        # to the stored state. Strategies that log events override this.
+        raise NotImplementedError(f"{type(self).__name__} does not support write-ahead logging")
 
     @abstractmethod
     def add(self, memory: Dict[str, Any]):
         pass
 
+    def add_many(self, memories: List[Dict[str, Any]]):
+        # Strategies override this when a batch can be applied in one pass;
+        # the final state must match adding the items one at a time.
+        for memory in memories:
+            self.add(memory)
+
     @abstractmethod
     def retrieve(self, query: str, top_k: int = 1, current_time: float = None) -> List[Dict[str, Any]]:
         pass
 
+    def retrieve_many(
+        self, queries: List[str], top_k: int = 1, current_time: float = None
+    ) -> List[List[Dict[str, Any]]]:
+        # Per-query results, identical to calling retrieve() for each query
+        # in order (including any access updates retrieve makes). Strategies
+        # override this to match every query in one pass over their items.
+        return [self.retrieve(query, top_k=top_k, current_time=current_time) for query in queries]
+
+    @property
+    def executor(self) -> Executor:
+        # The async methods run the blocking ones here, off the event loop.
+        # A single worker keeps calls in submission order and one at a time,
+        # which is what the (unsynchronized) strategies need.
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=type(self).__name__)
+        return self._executor
+
+    @executor.setter
+    def executor(self, executor: Executor):
+        self._executor = executor
+
+    def _run_async(self, fn, *args, **kwargs) -> "asyncio.Future":
+        return asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    async def aadd(self, memory: Dict[str, Any]):
+        await self._run_async(self.add, memory)
+
+    async def aadd_many(self, memories: List[Dict[str, Any]]):
+        await self._run_async(self.add_many, memories)
+
+    async def aretrieve(self, query: str, top_k: int = 1, current_time: float = None) -> List[Dict[str, Any]]:
+        return await self._run_async(self.retrieve, query, top_k=top_k, current_time=current_time)
+
+    async def aretrieve_many(
+        self, queries: List[str], top_k: int = 1, current_time: float = None
+    ) -> List[List[Dict[str, Any]]]:
+        return await self._run_async(self.retrieve_many, queries, top_k=top_k, current_time=current_time)
+
+    def shutdown_executor(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
     @abstractmethod
     def stats(self) -> Dict[str, Any]:
         pass
@@ -0,0 +1,338 @@
+# memory/concurrent_memory.py
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from memory.base_memory import BaseMemory
+from memory.multi_match import MultiMatcher
+from memory.utility_weighted_memory import UtilityWeightedMemory
+from memory.wal import WriteAheadLog
+
+
+class _ReadView:
+    """What retrieval needs, published by the writer side."""
+
+    __slots__ = ("version", "length", "ids", "records", "impact", "access_count", "alive", "chunks")
+
+    def __init__(self, version: int, length: int, ids: np.ndarray, records, impact: np.ndarray,
+                 access_count: np.ndarray, alive: np.ndarray, chunks: Tuple[Tuple[int, int, Any], ...]):
+        self.version = version
+        self.length = length  # rows [0, length) belong to this view
+        self.ids = ids
+        self.records = records  # row -> result dict
+        self.impact = impact
+        self.access_count = access_count
+        self.alive = alive
+        # (first row, end row, lowered contents joined by MultiMatcher.join,
+        # or a tuple of them if they cannot be joined)
+        self.chunks = chunks
+
+
+class ConcurrentMemory(BaseMemory):
+    """
+    Thread-safe UtilityWeightedMemory for many agent threads, RCU style.
+
+    Writers (add, add_many) and the access applier take one lock and
+    mutate the wrapped memory. Readers never lock: retrieve() ranks
+    against the latest published _ReadView, a row per item in insertion
+    order (item id, impact, access_count, alive flag) plus the lowercase
+    content joined in chunks of CHUNK_ROWS rows.
+
+    Publishing is incremental. The wrapped memory reports inserts and
+    evictions (UtilityWeightedMemory._changes); new items are appended as
+    rows, evicted ones are tombstoned in the alive mask, and only the last,
+    still filling chunk is re-joined. Rows are never rewritten, so a
+    reader holding an older view keeps a consistent picture: at most it
+    sees a later tombstone or access count. Once tombstones outnumber live
+    rows the rows are rebuilt from the memory, which amortizes to O(1)
+    per eviction.
+
+    Retrieval does not touch items. It queues (item ids, time) access
+    records instead, and a background thread applies the queue every
+    `apply_interval` seconds, coalescing repeated accesses to an item into
+    one update (count, latest time) and writing the new counts into the
+    touched rows in place; it takes the writer lock for APPLY_SLICE items
+    at a time, so a large backlog does not stall writers. A view is published
+    after `publish_every` writes and on add_many(), so a retrieve can miss
+    at most that many recent inserts and the accesses still in the queue.
+
+    Ranking matches the wrapped memory's: every match is scored as it
+    will be once accessed (access_count + 1, age 0), highest first, ties
+    by insertion order; access_policy decides whether all matches or only
+    the returned top_k are credited. With the dict backend results are
+    the stored dicts; with the columnar backend they are dicts built from
+    the rows, since a MemoryRecord dies with its slot.
+
+    Args:
+        memory: The UtilityWeightedMemory to share
+        publish_every: Writes between view refreshes
+        apply_interval: Seconds between access-batch applications
+    """
+
+    CHUNK_ROWS = 1024
+    APPLY_SLICE = 256
+
+    def __init__(self, memory: UtilityWeightedMemory, publish_every: int = 64, apply_interval: float = 0.01):
+        super().__init__(memory.capacity, memory.low_watermark)
+        if publish_every < 1:
+            raise ValueError("publish_every must be >= 1")
+        self.memory = memory
+        self.publish_every = publish_every
+        self.apply_interval = apply_interval
+        self._lock = threading.Lock()
+        self._applying = threading.Lock()
+        # deque.append / popleft are atomic, so readers queue without a lock
+        self._accesses: deque = deque()
+        self._writes_since_publish = 0
+        self._version = 0
+        self._applied_batches = 0
+        self._applied_accesses = 0
+        self._rebuilds = 0
+        memory._changes = []
+        self._rebuild()
+        self._view = self._make_view()
+        self._stop = threading.Event()
+        self._applier = threading.Thread(target=self._apply_loop, name="access-applier", daemon=True)
+        self._applier.start()
+
+    def _rebuild(self):
+        # Caller holds the lock (or is __init__). Fresh rows for every live
+        # item; views published before keep the old arrays.
+        self.memory._changes.clear()
+        rows = max(2 * len(self.memory.memories), self.CHUNK_ROWS)
+        self._ids = np.full(rows, -1, dtype=np.int64)
+        self._impact = np.zeros(rows, dtype=np.float64)
+        self._access_count = np.zeros(rows, dtype=np.float64)
+        self._alive = np.zeros(rows, dtype=bool)
+        self._timestamp = np.zeros(rows, dtype=np.float64)
+        self._last_access = np.zeros(rows, dtype=np.float64)
+        self._contents: List[str] = []
+        self._records: List[Dict[str, Any]] = []  # dict backend only
+        self._row_of: Dict[int, int] = {}
+        self._length = 0
+        self._dead = 0
+        self._chunks: List[Tuple[int, int, Any]] = []  # full chunks
+        self._tail: List[str] = []  # lowered contents after the last full chunk
+        self._tail_chunk: Optional[Tuple[int, int, Any]] = None
+        self._append(list(self.memory.memories))
+        self._rebuilds += 1
+
+    def _grow(self, needed: int):
+        rows = max(needed, 2 * len(self._ids))
+        for name, fill in (("_ids", -1), ("_impact", 0), ("_access_count", 0), ("_alive", False),
+                           ("_timestamp", 0), ("_last_access", 0)):
+            old = getattr(self, name)
+            grown = np.full(rows, fill, dtype=old.dtype)
+            grown[:self._length] = old[:self._length]
+            setattr(self, name, grown)
+
+    def _append(self, item_ids: List[int]):
+        """Append rows for `item_ids` (ascending, all live)."""
+        if not item_ids:
+            return
+        memory = self.memory
+        start, end = self._length, self._length + len(item_ids)
+        if end > len(self._ids):
+            self._grow(end)
+        rows = slice(start, end)
+        self._ids[rows] = item_ids
+        self._alive[rows] = True
+        store = memory._store
+        if store is not None:
+            slots = np.array([memory.memories[i].slot for i in item_ids], dtype=np.intp)
+            self._impact[rows] = store.impact[slots]
+            self._access_count[rows] = store.access_count[slots]
+            self._timestamp[rows] = store.timestamp[slots]
+            self._last_access[rows] = store.last_access_time[slots]
+            contents = [store._contents[cid] for cid in store.content_id[slots].tolist()]
+        else:
+            items = [memory.memories[i] for i in item_ids]
+            self._impact[rows] = [m.get("impact", 0) for m in items]
+            self._access_count[rows] = [m.get("access_count", 0) for m in items]
+            self._records.extend(items)
+            contents = [m["content"] for m in items]
+        self._contents.extend(contents)
+        self._row_of.update(zip(item_ids, range(start, end)))
+        self._length = end
+
+        # Freeze every chunk that is now full; re-join only the tail
+        tail_start = self._chunks[-1][1] if self._chunks else 0
+        self._tail.extend(content.lower() for content in contents)
+        while len(self._tail) >= self.CHUNK_ROWS:
+            full, self._tail = self._tail[:self.CHUNK_ROWS], self._tail[self.CHUNK_ROWS:]
+            self._chunks.append((tail_start, tail_start + self.CHUNK_ROWS, self._join(full)))
+            tail_start += self.CHUNK_ROWS
+        self._tail_chunk = (tail_start, end, self._join(self._tail)) if self._tail else None
+
+    @staticmethod
+    def _join(texts: List[str]):
+        # A chunk with a text containing MultiMatcher.SEPARATOR keeps its
+        # texts, matched one by one
+        joined = MultiMatcher.join(texts)
+        return tuple(texts) if joined is None else joined
+
+    def _make_view(self) -> _ReadView:
+        self._version += 1
+        chunks = tuple(self._chunks) + ((self._tail_chunk,) if self._tail_chunk else ())
+        if self.memory._store is not None:
+            contents, timestamp, impact = self._contents, self._timestamp, self._impact
+            access_count, last_access = self._access_count, self._last_access
+
+            def records(row: int) -> Dict[str, Any]:
+                return {
+                    "content": contents[row],
+                    "timestamp": float(timestamp[row]),
+                    "impact": float(impact[row]),
+                    "access_count": int(access_count[row]),
+                    "last_access_time": float(last_access[row]),
+                }
+        else:
+            records = self._records.__getitem__
+        return _ReadView(self._version, self._length, self._ids, records, self._impact,
+                         self._access_count, self._alive, chunks)
+
+    def _publish(self):
+        # Caller holds the lock
+        changes = self.memory._changes
+        memories = self.memory.memories
+        added = [item_id for op, item_id in changes if op == WriteAheadLog.ADD and item_id in memories]
+        evicted = [item_id for op, item_id in changes if op == WriteAheadLog.EVICT]
+        changes.clear()
+        self._append(added)
+        rows = [self._row_of.pop(item_id) for item_id in evicted if item_id in self._row_of]
+        self._alive[rows] = False
+        self._dead += len(rows)
+        if self._dead > max(self._length - self._dead, self.CHUNK_ROWS):
+            self._rebuild()
+        self._view = self._make_view()
+        self._writes_since_publish = 0
+
+    def add(self, memory: Dict[str, Any]):
+        with self._lock:
+            self.memory.add(memory)
+            self._inserts += 1
+            self._writes_since_publish += 1
+            if self._writes_since_publish >= self.publish_every:
+                self._publish()
+
+    def add_many(self, memories: List[Dict[str, Any]]):
+        memories = list(memories)
+        with self._lock:
+            self.memory.add_many(memories)
+            self._inserts += len(memories)
+            self._publish()
+
+    def retrieve(self, query: str, top_k: int = 1, current_time: float = None) -> List[Dict[str, Any]]:
+        return self.retrieve_many([query], top_k, current_time)[0]
+
+    def retrieve_many(
+        self, queries: List[str], top_k: int = 1, current_time: float = None
+    ) -> List[List[Dict[str, Any]]]:
+        if current_time is None:
+            current_time = time.time()
+        view = self._view
+        lowered = [query.lower() for query in queries]
+        patterns = list(dict.fromkeys(lowered))
+        position = {pattern: i for i, pattern in enumerate(patterns)}
+        matcher = MultiMatcher(patterns)
+        per_pattern: List[List[int]] = [[] for _ in patterns]
+        for start, end, text in view.chunks:
+            if isinstance(text, str):
+                chunk_matches = matcher.match_joined(range(start, end), text)
+            else:
+                chunk_matches = matcher.match_each(range(start, end), text)
+            for rows, matched in zip(per_pattern, chunk_matches):
+                rows.extend(matched)
+        return [self._rank(view, per_pattern[position[q]], top_k, current_time) for q in lowered]
+
+    def _rank(self, view: _ReadView, rows: List[int], top_k: int, current_time: float) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+        memory = self.memory
+        rows = np.asarray(rows, dtype=np.intp)
+        rows = rows[view.alive[rows]]
+        if not len(rows):
+            return []
+        scores = memory.w_freq * (view.access_count[rows] + 1) + memory.w_impact * view.impact[rows]
+        # rows are in insertion order, so a stable sort keeps ties oldest first
+        order = rows[np.argsort(-scores, kind="stable")][:top_k]
+        credited = rows if memory.access_policy == "all" else order
+        self._accesses.append((view.ids[credited], current_time))
+        return [view.records(row) for row in order.tolist()]
+
+    def _apply_loop(self):
+        while not self._stop.wait(self.apply_interval):
+            if self._accesses:
+                with self._applying:
+                    self._apply_accesses(locked=False)
+
+    def _apply_accesses(self, locked: bool = True):
+        # Caller holds _applying, so flush() cannot overtake the applier.
+        # Accesses are coalesced per item first; unless the caller already
+        # holds the writer lock, it is then taken for APPLY_SLICE items at a
+        # time so writers can interleave.
+        batches = []
+        while self._accesses:
+            batches.append(self._accesses.popleft())
+        if not batches:
+            return
+        ids, counts, latest = self.memory._coalesce_accesses(batches)
+        step = max(len(ids), 1) if locked else self.APPLY_SLICE
+        for start in range(0, len(ids), step):
+            part = slice(start, start + step)
+            if locked:
+                self._apply_slice(ids[part], counts[part], latest[part])
+            else:
+                with self._lock:
+                    self._apply_slice(ids[part], counts[part], latest[part])
+        self._applied_batches += len(batches)
+
+    def _apply_slice(self, ids: np.ndarray, counts: np.ndarray, latest: np.ndarray):
+        # Caller holds the lock. Touched rows get their new counts in place;
+        # nothing else about the view changes, so it is not republished.
+        memory = self.memory
+        self._applied_accesses += memory._apply_coalesced(ids, counts, latest)
+        row_of = self._row_of
+        touched = [item_id for item_id in ids.tolist() if item_id in row_of and item_id in memory.memories]
+        if not touched:
+            return
+        rows = np.array([row_of[item_id] for item_id in touched], dtype=np.intp)
+        if memory._store is not None:
+            store = memory._store
+            slots = np.array([memory.memories[i].slot for i in touched], dtype=np.intp)
+            self._access_count[rows] = store.access_count[slots]
+            self._last_access[rows] = store.last_access_time[slots]
+        else:
+            self._access_count[rows] = [memory.memories[i].get("access_count", 0) for i in touched]
+
+    def flush(self):
+        """Apply every queued access and publish a fresh view now."""
+        with self._applying, self._lock:
+            self._apply_accesses()
+            self._publish()
+
+    def close(self):
+        """Stop the applier thread after applying what is queued."""
+        self._stop.set()
+        self._applier.join()
+        self.flush()
+        self.memory._changes = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = self.memory.stats()
+            view = self._view
+            stats["concurrency"] = {
+                "view_version": view.version,
+                "view_size": int(np.count_nonzero(view.alive[:view.length])),
+                "view_rows": view.length,
+                "rebuilds": self._rebuilds,
+                "queued_accesses": len(self._accesses),
+                "applied_batches": self._applied_batches,
+                "applied_accesses": self._applied_accesses,
+            }
+        return stats
@@ -0,0 +1,138 @@
+# memory/embedding_cache.py
+
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache of embeddings keyed by a hash of the content string.
+
+    Vectors are kept in one (max_entries, dim) float32 matrix and the
+    16-byte content digests in a parallel key array. When `path` is given
+    both arrays are memory-mapped `.npy` files (`path` and
+    `path + ".keys.npy"`), so a later process pointing at the same path
+    starts with every previously cached embedding and never calls the model
+    for that text.
+
+    Args:
+        max_entries: Maximum number of cached embeddings
+        path: Optional `.npy` file to persist the cache to
+    """
+
+    DIGEST_SIZE = 16
+
+    def __init__(self, max_entries: int = 100_000, path: Optional[str] = None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.max_entries = max_entries
+        self.path = path
+        self._vectors = None  # (max_entries, dim) float32, allocated on first put
+        self._keys = None     # (max_entries,) V16 digests, all-zero when free
+        self._slots: "OrderedDict[bytes, int]" = OrderedDict()  # digest -> slot, LRU first
+        self._free_slots: List[int] = []
+        self.hits = 0
+        self.misses = 0
+
+        if path is not None and os.path.exists(path):
+            self._open(path)
+
+    @property
+    def keys_path(self) -> Optional[str]:
+        return None if self.path is None else self.path + ".keys.npy"
+
+    @classmethod
+    def digest(cls, text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=cls.DIGEST_SIZE).digest()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, text: str) -> bool:
+        return self.digest(text) in self._slots
+
+    def _open(self, path: str):
+        vectors = np.load(path, mmap_mode="r+")
+        keys = np.load(self.keys_path, mmap_mode="r+")
+        if vectors.shape[0] != keys.shape[0]:
+            raise ValueError(f"corrupt embedding cache at {path}: vector/key row mismatch")
+        if vectors.shape[0] != self.max_entries:
+            raise ValueError(
+                f"embedding cache at {path} holds {vectors.shape[0]} rows, expected {self.max_entries}"
+            )
+        self._vectors, self._keys = vectors, keys
+        empty = bytes(self.DIGEST_SIZE)
+        for slot in range(keys.shape[0]):
+            key = bytes(keys[slot])
+            if key == empty:
+                self._free_slots.append(slot)
+            else:
+                self._slots[key] = slot
+        self._free_slots.reverse()
+
+    def _allocate(self, dim: int):
+        shape = (self.max_entries, dim)
+        if self.path is None:
+            self._vectors = np.zeros(shape, dtype=np.float32)
+            self._keys = np.zeros(self.max_entries, dtype=f"V{self.DIGEST_SIZE}")
+        else:
+            self._vectors = np.lib.format.open_memmap(self.path, mode="w+", dtype=np.float32, shape=shape)
+            self._keys = np.lib.format.open_memmap(
+                self.keys_path, mode="w+", dtype=f"V{self.DIGEST_SIZE}", shape=(self.max_entries,)
+            )
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self.digest(text)
+        slot = self._slots.get(key)
+        if slot is None:
+            self.misses += 1
+            return None
+        self._slots.move_to_end(key)
+        self.hits += 1
+        return np.array(self._vectors[slot])
+
+    def put(self, text: str, embedding):
+        vec = np.asarray(embedding, dtype=np.float32)
+        if self._vectors is None:
+            self._allocate(vec.shape[0])
+        elif vec.shape[0] != self._vectors.shape[1]:
+            raise ValueError(
+                f"embedding has dimension {vec.shape[0]}, cache stores {self._vectors.shape[1]}"
+            )
+
+        key = self.digest(text)
+        slot = self._slots.get(key)
+        if slot is not None:
+            self._slots.move_to_end(key)
+        else:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                _, slot = self._slots.popitem(last=False)  # Evict least recently used
+            self._slots[key] = slot
+            self._keys[slot] = np.void(key)
+        self._vectors[slot] = vec
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        return [self.get(text) for text in texts]
+
+    def flush(self):
+        """Write memory-mapped arrays back to disk (no-op when in-memory)."""
+        for array in (self._vectors, self._keys):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._slots),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,8 +1,12 @@
 import math
+import time
 from typing import List, Dict, Any
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
 from .base_memory import BaseMemory
+from .ann_index import IVFIndex
+from .embedding_cache import EmbeddingCache
+from .model_registry import DEFAULT_MODEL, get_model
+from .snapshot import Snapshot, pack_records, pack_strings
 
 
 class EmbeddingSimilarityMemory(BaseMemory):
@@ -10,40 +14,192 @@ class EmbeddingSimilarityMemory(BaseMemory):
     Memory strategy using dense embeddings and cosine similarity.
     
     Uses sentence-transformers/all-MiniLM-L6-v2 for semantic embeddings.
+    The model is shared by every instance through memory.model_registry and
+    is only loaded on the first encode.
     Stores embeddings for all memory items and ranks retrieval by cosine similarity.
-    Evicts the least similar item when capacity is reached.
+    Evicts the least similar item when capacity is reached; with
+    low_watermark set, one pass evicts the lowest-scoring items down to it.
+    
+    Embeddings live L2-normalized in one preallocated float32 matrix with a
+    row ("slot") per item; evicted slots are reused. Cosine similarity to a
+    query is then a single matrix-vector product.
     
     This is a realistic RAG baseline that mimics semantic search systems.
+    
+    Ingest can be batched: add_many() encodes a list of items in one model
+    call, and batch_size > 1 turns add() into a micro-batching buffer that is
+    flushed when it holds batch_size items or its oldest item is max_delay
+    (simulated) time units older than the newest. Items are still inserted
+    one at a time after encoding, so eviction matches sequential add() calls.
+    retrieve() flushes the buffer first.
+    
+    An optional EmbeddingCache is consulted before the model for both
+    stored items and queries, so repeated text is never encoded twice.
+    
+    An optional approximate nearest-neighbour index (IVFIndex) restricts
+    retrieval to the slots in the clusters nearest the query; recall_at_k()
+    measures how often it agrees with the exact search.
+    
+    storage="float16" or "int8" (with a per-row scale) shrinks the matrix 2x
+    or 4x. Similarity is computed block by block on the compressed rows;
+    stats() reports the bytes saved and the quantization error, which
+    bounds how far any cosine score can drift from float32.
+    
+    Eviction modes:
+        "pairwise": builds the full n x n cosine similarity matrix on every
+            eviction (O(n^2 * d)).
+        "centroid": keeps the running sum of normalized embeddings and each
+            item's similarity to it. Mean cosine similarity of item i is
+            dot(e_i, sum) / n, so the same victim is found in O(n * d).
     """
     
-    def __init__(self, capacity=20):
-        super().__init__(capacity)
-        self.memory = {}  # {item_id: {"content": str, "embedding": np.array, "impact": float, "timestamp": float}}
+    EVICTION_MODES = ("pairwise", "centroid")
+    STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+    # Rows upcast to float32 at a time when scoring a compressed matrix
+    SCORE_BLOCK_ROWS = 4096
+    
+    def __init__(
+        self,
+        capacity=20,
+        eviction="pairwise",
+        batch_size=1,
+        max_delay=None,
+        cache: EmbeddingCache = None,
+        model_name: str = DEFAULT_MODEL,
+        ann: IVFIndex = None,
+        storage: str = "float32",
+        low_watermark: int = None,
+    ):
+        super().__init__(capacity, low_watermark)
+        if eviction not in self.EVICTION_MODES:
+            raise ValueError(f"eviction must be one of {self.EVICTION_MODES}, got {eviction!r}")
+        if storage not in self.STORAGE_DTYPES:
+            raise ValueError(f"storage must be one of {tuple(self.STORAGE_DTYPES)}, got {storage!r}")
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.memory = {}  # {item_id: {"content": str, "slot": int, "impact": float, "timestamp": float}}
         self.item_counter = 0
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.model_name = model_name
+        self._model = None
         self.stats_data = {}
+        self.eviction = eviction
+        # Embedding storage, allocated on the first add once the dimension
+        # is known: capacity + 1 rows because add inserts before evicting.
+        self.storage = storage
+        self._matrix = None     # (rows, dim) unit-norm rows in the storage dtype
+        self._scales = None     # (rows,) float32 dequantization scale, int8 only
+        self._slot_ids = None   # item_id stored in each slot, -1 if free
+        # Quantization error ||stored - unit|| over everything ever stored
+        self._drift_sum = 0.0
+        self._drift_max = 0.0
+        self._drift_count = 0
+        self._free_slots = []
+        # Centroid mode state: sum of unit embeddings and, per slot, the
+        # dot product of its unit embedding with that sum.
+        self._unit_sum = None
+        self._sim_sums = None
+        self._updates_since_refresh = 0
+        # Micro-batching buffer of items waiting to be encoded
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._pending = []
+        self.cache = cache
+        self.ann = ann
+        self._ann_recall = None
+    
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_model(self.model_name)
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+    
+    def _encode_one(self, text: str) -> np.ndarray:
+        if self.cache is not None:
+            embedding = self.cache.get(text)
+            if embedding is not None:
+                return embedding
+        embedding = self.model.encode(text, convert_to_tensor=False)
+        if self.cache is not None:
+            self.cache.put(text, embedding)
+        return embedding
+    
+    def _encode_many(self, texts: List[str]) -> List[np.ndarray]:
+        if self.cache is None:
+            return list(self.model.encode(texts, convert_to_tensor=False))
+        
+        embeddings = self.cache.get_many(texts)
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if misses:
+            # Encode each distinct missing string once
+            unique = list(dict.fromkeys(texts[i] for i in misses))
+            encoded = dict(zip(unique, self.model.encode(unique, convert_to_tensor=False)))
+            for text, embedding in encoded.items():
+                self.cache.put(text, embedding)
+            for i in misses:
+                embeddings[i] = encoded[texts[i]]
+        return embeddings
     
     def add(self, memory_item: Dict[str, Any]):
         """
         Add an item to memory with semantic embedding.
         If at capacity, evict the least similar item.
         
+        With batch_size > 1 the item is buffered and only encoded and
+        inserted when the buffer flushes.
+        
         Args:
             memory_item: Dict with keys: content, impact, timestamp
         """
+        if self.batch_size == 1:
+            embedding = self._encode_one(memory_item.get("content", ""))
+            self._insert(memory_item, embedding)
+            return
+        
+        self._pending.append(memory_item)
+        oldest = self._pending[0].get("timestamp", 0.0)
+        newest = memory_item.get("timestamp", 0.0)
+        if len(self._pending) >= self.batch_size or (
+            self.max_delay is not None and newest - oldest >= self.max_delay
+        ):
+            self.flush()
+    
+    def add_many(self, memory_items: List[Dict[str, Any]]):
+        """
+        Add several items, encoding all of them in a single model call.
+        Any buffered items are encoded and inserted first, in order.
+        
+        Args:
+            memory_items: Dicts with keys: content, impact, timestamp
+        """
+        items = self._pending + list(memory_items)
+        self._pending = []
+        if not items:
+            return
+        
+        embeddings = self._encode_many([item.get("content", "") for item in items])
+        for item, embedding in zip(items, embeddings):
+            self._insert(item, embedding)
+    
+    def flush(self):
+        """Encode and insert everything in the micro-batching buffer."""
+        self.add_many([])
+    
+    def _insert(self, memory_item: Dict[str, Any], embedding):
         content = memory_item.get("content", "")
         impact = memory_item.get("impact", 0.1)
         timestamp = memory_item.get("timestamp", 0.0)
         
-        # Compute embedding for new item
-        embedding = self.model.encode(content, convert_to_tensor=False)
-        
         item_id = self.item_counter
         self.item_counter += 1
+        self._inserts += 1
         
         self.memory[item_id] = {
             "content": content,
-            "embedding": embedding,
+            "slot": self._store(item_id, embedding),
             "impact": impact,
             "timestamp": timestamp
         }
@@ -54,36 +210,193 @@ class EmbeddingSimilarityMemory(BaseMemory):
         else:
             self.stats_data[item_id] = "low"
         
-        # Evict if at capacity
-        if len(self.memory) > self.capacity:
-            self._evict_least_similar()
+        if self.eviction == "centroid":
+            self._centroid_add(item_id)
+        
+        # Evict if over capacity, down to low_watermark in one pass
+        count = self._overflow(len(self.memory))
+        if count:
+            started = time.perf_counter()
+            if self.eviction == "centroid":
+                self._evict_least_central(count)
+            else:
+                self._evict_least_similar(count)
+            self._record_eviction(count, started)
+        
+        if self.ann is not None and self.ann.needs_training(len(self.memory)):
+            slots = np.flatnonzero(self._slot_ids >= 0)
+            self.ann.train(self._rows(slots), slots)
+    
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        # Zero vectors stay zero, matching sklearn's cosine_similarity
+        return vec / norm if norm > 0 else vec
+    
+    def _allocate(self, dim: int):
+        rows = self.capacity + 1
+        self._matrix = np.zeros((rows, dim), dtype=self.STORAGE_DTYPES[self.storage])
+        if self.storage == "int8":
+            self._scales = np.zeros(rows, dtype=np.float32)
+        self._slot_ids = np.full(rows, -1, dtype=np.int64)
+        self._free_slots = list(range(rows - 1, -1, -1))
+        self._unit_sum = np.zeros(dim, dtype=np.float64)
+        self._sim_sums = np.zeros(rows, dtype=np.float64)
+    
+    def _store(self, item_id: int, embedding) -> int:
+        """Write the normalized embedding into a free slot and return it."""
+        unit = self._normalize(embedding)
+        if self._matrix is None:
+            self._allocate(unit.shape[0])
+        slot = self._free_slots.pop()
+        if self.storage == "int8":
+            peak = float(np.abs(unit).max()) if unit.size else 0.0
+            scale = peak / 127.0 if peak > 0 else 1.0
+            self._matrix[slot] = np.round(unit / scale).astype(np.int8)
+            self._scales[slot] = scale
+        else:
+            self._matrix[slot] = unit
+        self._slot_ids[slot] = item_id
+        
+        stored = self._row(slot)
+        if self.storage != "float32":
+            drift = float(np.linalg.norm(stored - unit))
+            self._drift_sum += drift
+            self._drift_max = max(self._drift_max, drift)
+            self._drift_count += 1
+        if self.ann is not None:
+            self.ann.add(slot, stored)
+        return slot
+    
+    def _row(self, slot: int) -> np.ndarray:
+        """Stored (dequantized) float32 unit vector of one slot."""
+        row = self._matrix[slot].astype(np.float32)
+        if self._scales is not None:
+            row *= self._scales[slot]
+        return row
     
-    def _evict_least_similar(self):
+    def _rows(self, slots: np.ndarray) -> np.ndarray:
+        rows = self._matrix[slots].astype(np.float32)
+        if self._scales is not None:
+            rows *= self._scales[slots, None]
+        return rows
+    
+    def _matvec(self, vec: np.ndarray, slots: np.ndarray = None) -> np.ndarray:
+        """Dot product of `vec` with every stored row (or just `slots`)."""
+        matrix = self._matrix if slots is None else self._matrix[slots]
+        if self.storage == "float32":
+            return matrix @ vec
+        scales = None
+        if self._scales is not None:
+            scales = self._scales if slots is None else self._scales[slots]
+        out = np.empty(matrix.shape[0], dtype=np.result_type(np.float32, vec.dtype))
+        step = self.SCORE_BLOCK_ROWS
+        for start in range(0, matrix.shape[0], step):
+            block = matrix[start:start + step].astype(np.float32) @ vec
+            if scales is not None:
+                block *= scales[start:start + step]
+            out[start:start + step] = block
+        return out
+    
+    def _remove(self, item_id: int):
+        slot = self.memory.pop(item_id)["slot"]
+        self._matrix[slot] = 0
+        if self._scales is not None:
+            self._scales[slot] = 0.0
+        self._slot_ids[slot] = -1
+        self._free_slots.append(slot)
+        if self.ann is not None:
+            self.ann.remove(slot)
+        if item_id in self.stats_data:
+            del self.stats_data[item_id]
+    
+    def _centroid_add(self, item_id):
+        slot = self.memory[item_id]["slot"]
+        unit = self._row(slot)
+        self._unit_sum += unit
+        # Free rows are zero, so they pick up nothing here
+        self._sim_sums += self._matvec(unit)
+        self._sim_sums[slot] = float(np.dot(unit, self._unit_sum))
+        self._updates_since_refresh += 1
+    
+    def _centroid_remove(self, item_id):
+        slot = self.memory[item_id]["slot"]
+        unit = self._row(slot)
+        self._unit_sum -= unit
+        self._sim_sums -= self._matvec(unit)
+        self._sim_sums[slot] = 0.0
+        self._updates_since_refresh += 1
+    
+    def _refresh_centroid(self):
+        """Recompute the running sums from scratch to bound float drift."""
+        active = np.flatnonzero(self._slot_ids >= 0)
+        self._unit_sum = self._rows(active).sum(axis=0, dtype=np.float64)
+        self._sim_sums = self._matvec(self._unit_sum)
+        self._updates_since_refresh = 0
+    
+    def _evict_least_central(self, count: int = 1):
         """
-        Evict the item with lowest average similarity to all other items.
-        This heuristic removes items that are least connected semantically.
+        Same victims as _evict_least_similar: mean cosine similarity of an
+        item to all items is its dot product with the unit-vector sum,
+        divided by the (shared) item count.
         """
-        if not self.memory:
+        if len(self.memory) <= 1:
             return
         
-        # Get all embeddings
-        item_ids = list(self.memory.keys())
-        embeddings = [self.memory[idx]["embedding"] for idx in item_ids]
+        if self._updates_since_refresh >= max(1, self.capacity):
+            self._refresh_centroid()
+        
+        scores = np.where(self._slot_ids >= 0, self._sim_sums, np.inf)
+        if count > 1:
+            # All victims chosen against the same sums, lowest first, ties by age
+            count = min(count, len(self.memory) - 1)
+            occupied = np.flatnonzero(self._slot_ids >= 0)
+            order = np.lexsort((self._slot_ids[occupied], scores[occupied]))[:count]
+            for evicted_id in self._slot_ids[occupied[order]].tolist():
+                self._centroid_remove(evicted_id)
+                self._remove(evicted_id)
+            return
+        
+        # First item (insertion order) with the lowest score, like list.index(min).
+        # Incremental sums of duplicate embeddings can differ in the last bits
+        # of float32 precision, so scores that close to the minimum count as ties.
+        lowest = scores.min()
+        threshold = lowest + 8 * np.finfo(np.float32).eps * max(1.0, abs(lowest))
+        tied = np.flatnonzero(scores <= threshold)
+        evicted_id = int(self._slot_ids[tied].min())
+        self._centroid_remove(evicted_id)
+        self._remove(evicted_id)
+    
+    def _evict_least_similar(self, count: int = 1):
+        """
+        Evict the `count` items with lowest average similarity to all other
+        items. This heuristic removes items that are least connected
+        semantically.
+        """
+        if not self.memory:
+            return
         
         # Compute average similarity for each item to all others
-        if len(embeddings) == 1:
+        if len(self.memory) == 1:
             # Only one item, can't evict
             return
         
-        similarities = cosine_similarity(embeddings)
-        avg_sims = [similarities[i].mean() for i in range(len(item_ids))]
+        # Rows in insertion order so argmin breaks ties like list.index(min)
+        slots = np.fromiter(
+            (item["slot"] for item in self.memory.values()), dtype=np.intp, count=len(self.memory)
+        )
+        embeddings = self._rows(slots)
+        avg_sims = (embeddings @ embeddings.T).mean(axis=1)
         
-        # Evict item with lowest similarity (most anomalous / least connected)
-        min_idx = avg_sims.index(min(avg_sims))
-        evicted_id = item_ids[min_idx]
-        del self.memory[evicted_id]
-        if evicted_id in self.stats_data:
-            del self.stats_data[evicted_id]
+        # Evict items with lowest similarity (most anomalous / least connected)
+        if count == 1:
+            victims = [int(np.argmin(avg_sims))]
+        else:
+            count = min(count, len(slots) - 1)
+            victims = np.argsort(avg_sims, kind="stable")[:count].tolist()
+        for idx in victims:
+            self._remove(int(self._slot_ids[slots[idx]]))
     
     def retrieve(self, query: str, top_k: int = 1, current_time: float = None) -> List[Dict[str, Any]]:
         """
@@ -98,38 +411,212 @@ class EmbeddingSimilarityMemory(BaseMemory):
         Returns:
             List of dicts with keys: content, score, impact
         """
+        if self._pending:
+            self.flush()
+        
         if not self.memory:
             return []
         
         # Encode query
-        query_embedding = self.model.encode(query, convert_to_tensor=False)
+        query_embedding = self._normalize(self._encode_one(query))
+        return self._results(query_embedding, top_k)
+    
+    def retrieve_many(
+        self, queries: List[str], top_k: int = 1, current_time: float = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve for several queries, encoding all of them in a single
+        model call. Results match calling retrieve() for each query.
         
-        # Compute similarity to all items
-        results = []
-        item_ids = list(self.memory.keys())
-        embeddings = [self.memory[idx]["embedding"] for idx in item_ids]
-        similarities = cosine_similarity([query_embedding], embeddings)[0]
+        Args:
+            queries: Query strings
+            top_k: Number of top results per query
+            current_time: Current time (for compatibility, not used here)
+            
+        Returns:
+            One result list per query, as returned by retrieve()
+        """
+        if self._pending:
+            self.flush()
+        
+        if not self.memory or not queries:
+            return [[] for _ in queries]
         
-        for idx, item_id in enumerate(item_ids):
-            similarity_score = similarities[idx]
+        embeddings = self._encode_many(list(queries))
+        return [self._results(self._normalize(embedding), top_k) for embedding in embeddings]
+    
+    def _results(self, query_embedding: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        slots, scores = self._search(query_embedding, top_k)
+        
+        results = []
+        for slot, score in zip(slots, scores):
+            item = self.memory[int(self._slot_ids[slot])]
             results.append({
-                "content": self.memory[item_id]["content"],
-                "score": similarity_score,
-                "impact": self.memory[item_id]["impact"]
+                "content": item["content"],
+                "score": float(score),
+                "impact": item["impact"]
             })
         
-        # Sort by similarity (highest first)
-        results.sort(key=lambda x: x["score"], reverse=True)
+        return results
+    
+    def _search(self, query_embedding: np.ndarray, top_k: int, exact: bool = False):
+        """
+        Return (slots, scores) of the top_k items, best first.
+        Uses the ANN index when it is trained unless exact=True.
+        """
+        if self.ann is not None and self.ann.is_trained and not exact:
+            slots = self.ann.candidates(query_embedding)
+            scores = self._matvec(query_embedding, slots)
+        else:
+            # Cosine similarity to every slot; free slots can never be returned
+            slots = np.arange(self._matrix.shape[0])
+            scores = self._matvec(query_embedding)
+            scores[self._slot_ids < 0] = -np.inf
+        
+        k = min(top_k, len(self.memory), len(slots))
+        if k <= 0:
+            return slots[:0], scores[:0]
+        if k < len(scores):
+            kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+            # Keep everything tied with the k-th score so ties resolve by age
+            keep = np.flatnonzero(scores >= kth)
+            slots, scores = slots[keep], scores[keep]
         
-        return results[:top_k]
+        # Highest similarity first, earlier insertions first among equals
+        order = np.lexsort((self._slot_ids[slots], -scores))[:k]
+        return slots[order], scores[order]
+    
+    def recall_at_k(self, queries: List[str], k: int = 10) -> float:
+        """
+        Mean fraction of the exact top-k that the ANN path also returns.
+        The result is reported by stats() under "ann".
+        """
+        if self._pending:
+            self.flush()
+        if not self.memory or not queries:
+            return 1.0
+        
+        embeddings = self._encode_many(list(queries))
+        recalls = []
+        for embedding in embeddings:
+            query_embedding = self._normalize(embedding)
+            exact, _ = self._search(query_embedding, k, exact=True)
+            approx, _ = self._search(query_embedding, k)
+            recalls.append(len(np.intersect1d(exact, approx)) / len(exact))
+        self._ann_recall = float(np.mean(recalls))
+        return self._ann_recall
+    
+    def _snapshot(self):
+        """
+        Constructor config, scalar state and arrays for memory.snapshot.
+        The embedding matrix is written raw in its storage dtype, so a
+        restore maps it back without re-encoding anything; items still
+        waiting in the micro-batching buffer are saved unencoded.
+        """
+        config = {
+            "capacity": self.capacity,
+            "eviction": self.eviction,
+            "batch_size": self.batch_size,
+            "max_delay": self.max_delay,
+            "model_name": self.model_name,
+            "storage": self.storage,
+            "low_watermark": self.low_watermark,
+        }
+        state = dict(
+            self._cost_state(),
+            item_counter=self.item_counter,
+            drift=[self._drift_sum, self._drift_max, self._drift_count],
+            updates_since_refresh=self._updates_since_refresh,
+        )
+        items = list(self.memory.values())
+        arrays = {
+            "item_id": np.fromiter(self.memory, dtype=np.int64, count=len(items)),
+            "slot": np.array([item["slot"] for item in items], dtype=np.int64),
+            "impact": np.array([item["impact"] for item in items], dtype=np.float64),
+            "timestamp": np.array([item["timestamp"] for item in items], dtype=np.float64),
+        }
+        pack_strings(arrays, "content", [item["content"] for item in items])
+        pack_records(arrays, state, "pending.", self._pending)
+        if self._matrix is not None:
+            arrays.update(matrix=self._matrix, slot_ids=self._slot_ids, unit_sum=self._unit_sum, sim_sums=self._sim_sums)
+            if self._scales is not None:
+                arrays["scales"] = self._scales
+        return config, state, arrays
+    
+    @classmethod
+    def _from_snapshot(
+        cls, snapshot: Snapshot, cache: EmbeddingCache = None, ann: IVFIndex = None
+    ) -> "EmbeddingSimilarityMemory":
+        """
+        Rebuild a memory from a snapshot. The matrix and per-slot arrays
+        are copy-on-write views of the file; an `ann` index is trained on
+        the restored rows once there are enough of them.
+        """
+        memory = cls(**snapshot.config, cache=cache, ann=ann)
+        state = snapshot.state
+        memory._restore_cost_state(state)
+        memory.item_counter = state["item_counter"]
+        memory._drift_sum, memory._drift_max, memory._drift_count = state["drift"]
+        memory._updates_since_refresh = state["updates_since_refresh"]
+        memory._pending = snapshot.records("pending.")
+        
+        if "matrix" in snapshot:
+            memory._matrix = snapshot.array("matrix")
+            memory._slot_ids = snapshot.array("slot_ids")
+            memory._unit_sum = snapshot.array("unit_sum")
+            memory._sim_sums = snapshot.array("sim_sums")
+            if "scales" in snapshot:
+                memory._scales = snapshot.array("scales")
+            memory._free_slots = np.flatnonzero(memory._slot_ids < 0)[::-1].tolist()
+        
+        columns = zip(
+            snapshot.array("item_id").tolist(),
+            snapshot.strings("content"),
+            snapshot.array("slot").tolist(),
+            snapshot.array("impact").tolist(),
+            snapshot.array("timestamp").tolist(),
+        )
+        for item_id, content, slot, impact, timestamp in columns:
+            memory.memory[item_id] = {"content": content, "slot": slot, "impact": impact, "timestamp": timestamp}
+            memory.stats_data[item_id] = "high" if impact > 0.5 else "low"
+        
+        if ann is not None and ann.needs_training(len(memory.memory)):
+            slots = np.flatnonzero(memory._slot_ids >= 0)
+            ann.train(memory._rows(slots), slots)
+        return memory
     
     def stats(self):
         """Return statistics about memory state."""
         high_impact = sum(1 for v in self.stats_data.values() if v == "high")
         low_impact = sum(1 for v in self.stats_data.values() if v == "low")
-        return {
+        stats = {
             "total": len(self.memory),
             "capacity": self.capacity,
             "high_impact": high_impact,
-            "low_impact": low_impact
+            "low_impact": low_impact,
+            "pending": len(self._pending),
+            "low_watermark": self.low_watermark,
+            "eviction_cost": self.eviction_cost(),
+        }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        if self.ann is not None:
+            stats["ann"] = dict(self.ann.stats(), recall_at_k=self._ann_recall)
+        stats["storage"] = self._storage_stats()
+        return stats
+    
+    def _storage_stats(self) -> Dict[str, Any]:
+        if self._matrix is None:
+            return {"dtype": self.storage, "bytes": 0, "bytes_saved": 0}
+        used = self._matrix.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+        float32_bytes = self._matrix.size * 4
+        stats = {
+            "dtype": self.storage,
+            "bytes": used,
+            "bytes_saved": float32_bytes - used,
         }
+        if self.storage != "float32":
+            # ||stored - unit|| bounds |score - float32 score| for any unit query
+            stats["score_drift_mean"] = self._drift_sum / self._drift_count if self._drift_count else 0.0
+            stats["score_drift_max"] = self._drift_max
+        return stats
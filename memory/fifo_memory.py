@@ -1,27 +1,155 @@
 # memory/fifo_memory.py
 
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
 from collections import deque
+from memory.multi_match import MultiMatcher
 from memory.base_memory import BaseMemory
+from memory.ngram_index import NgramIndex
+from memory.query_cache import QueryCache
+from memory.snapshot import Snapshot, pack_records
+from memory.wal import WriteAheadLog
 
 
 class FIFOMemory(BaseMemory):
-    def __init__(self, capacity: int):
-        super().__init__(capacity)
+    def __init__(
+        self,
+        capacity: int,
+        use_index: bool = False,
+        low_watermark: Optional[int] = None,
+        query_cache: QueryCache = None,
+        wal: WriteAheadLog = None,
+    ):
+        super().__init__(capacity, low_watermark)
         self.buffer = deque()
+        self.wal = wal
+        # Optional trigram index and query cache; ids are monotonic so
+        # sorting them reproduces buffer order.
+        self._index = NgramIndex() if use_index else None
+        self.query_cache = query_cache
+        self._keyed = use_index or query_cache is not None
+        self._ids = deque()
+        self._items: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 0
 
-    def add(self, memory: Dict[str, Any]):
-        if len(self.buffer) >= self.capacity:
+    def _evict_oldest(self, count: int):
+        for _ in range(count):
             self.buffer.popleft()  # FIFO eviction
+            if self.wal is not None:
+                self.wal.log_evict(self._ids[0] if self._keyed else -1)
+            if self._keyed:
+                evicted_id = self._ids.popleft()
+                del self._items[evicted_id]
+                if self._index is not None:
+                    self._index.remove(evicted_id)
+                if self.query_cache is not None:
+                    self.query_cache.removed(evicted_id)
+
+    def _append(self, memory: Dict[str, Any]):
+        if self.wal is not None:
+            self.wal.log_add(self._next_id if self._keyed else -1, memory)
         self.buffer.append(memory)
+        if self._keyed:
+            item_id = self._next_id
+            self._next_id += 1
+            self._ids.append(item_id)
+            self._items[item_id] = memory
+            if self._index is not None:
+                self._index.add(item_id, memory["content"])
+            if self.query_cache is not None:
+                self.query_cache.added(item_id, memory["content"].lower())
+
+    def add(self, memory: Dict[str, Any]):
+        self._inserts += 1
+        if len(self.buffer) >= self.capacity:
+            started = time.perf_counter()
+            count = min(self._overflow(len(self.buffer) + 1), len(self.buffer))
+            self._evict_oldest(count)
+            self._record_eviction(count, started)
+        self._append(memory)
+
+    def add_many(self, memories: List[Dict[str, Any]]):
+        memories = list(memories)
+        if self.capacity < 1 or self.low_watermark != self.capacity:
+            return super().add_many(memories)
+        # Only the last `capacity` items of buffer + batch survive
+        self._inserts += len(memories)
+        overflow = max(0, len(self.buffer) + len(memories) - self.capacity)
+        if overflow:
+            started = time.perf_counter()
+            self._evict_oldest(min(overflow, len(self.buffer)))
+            self._record_eviction(overflow, started)
+        for memory in memories[-self.capacity:]:
+            self._append(memory)
 
     def retrieve(self, query: str, top_k: int = 1, current_time: float = None) -> List[Dict[str, Any]]:
+        if self._keyed:
+            matches = sorted(self._search(query))
+            return [self._items[i] for i in matches[:top_k]]
         # naive keyword match
         results = [m for m in self.buffer if query.lower() in m["content"].lower()]
         return results[:top_k]
 
+    def retrieve_many(
+        self, queries: List[str], top_k: int = 1, current_time: float = None
+    ) -> List[List[Dict[str, Any]]]:
+        if self._keyed or len(queries) < 2:
+            return super().retrieve_many(queries, top_k, current_time)
+        # One pass over the buffer matches every query
+        lowered = [query.lower() for query in queries]
+        patterns = list(dict.fromkeys(lowered))
+        position = {pattern: i for i, pattern in enumerate(patterns)}
+        items = list(self.buffer)
+        per_pattern = MultiMatcher(patterns).match(items, [m["content"].lower() for m in items])
+        return [per_pattern[position[q]][:top_k] for q in lowered]
+
+    def _search(self, query: str):
+        if self.query_cache is None:
+            return self._index.search(query)
+        q = query.lower()
+        ids = self.query_cache.get(q)
+        if ids is None:
+            if self._index is not None:
+                ids = self._index.search(query)
+            else:
+                ids = {i for i, m in self._items.items() if q in m["content"].lower()}
+            self.query_cache.put(q, ids)
+        return ids
+
+    def _replay(self, op: int, key: Any, time: float, memory: Optional[Dict[str, Any]]):
+        # Events replay in order, so ids and evictions line up again
+        if op == WriteAheadLog.ADD:
+            self._append(memory)
+            self._inserts += 1
+        elif op == WriteAheadLog.EVICT:
+            self._evict_oldest(1)
+            self._evicted += 1
+
+    def _snapshot(self):
+        config = {"capacity": self.capacity, "use_index": self._index is not None, "low_watermark": self.low_watermark}
+        state = self._cost_state()
+        arrays = {}
+        pack_records(arrays, state, "items.", list(self.buffer))
+        return config, state, arrays
+
+    @classmethod
+    def _from_snapshot(cls, snapshot: Snapshot, query_cache: QueryCache = None) -> "FIFOMemory":
+        memory = cls(**snapshot.config, query_cache=query_cache)
+        memory._restore_cost_state(snapshot.state)
+        if query_cache is not None:
+            query_cache.clear()
+        # Appending replays the index and id bookkeeping in buffer order
+        for item in snapshot.records("items."):
+            memory._append(item)
+        return memory
+
     def stats(self):
-        return {
+        stats = {
             "size": len(self.buffer),
-            "capacity": self.capacity
+            "capacity": self.capacity,
+            "low_watermark": self.low_watermark,
+            "eviction_cost": self.eviction_cost(),
         }
+        if self.query_cache is not None:
+            stats["query_cache"] = self.query_cache.stats()
+        return stats
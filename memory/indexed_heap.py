@@ -0,0 +1,105 @@
+# memory/indexed_heap.py
+
+import heapq
+from typing import Any, Dict, Hashable, List, Tuple
+
+
+class IndexedMinHeap:
+    """
+    Binary min-heap of (key, item_id) entries with a position index.
+
+    Unlike heapq, every item_id can have its key changed or be removed in
+    O(log n), which is what eviction needs when retrieval bumps an item's
+    utility in place.
+    """
+
+    def __init__(self):
+        self._heap: List[List[Any]] = []  # [key, item_id]
+        self._pos: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self._pos
+
+    def push(self, item_id: Hashable, key: Any):
+        if item_id in self._pos:
+            self.update(item_id, key)
+            return
+        self._heap.append([key, item_id])
+        self._pos[item_id] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def build(self, entries: List[Tuple[Hashable, Any]]):
+        """Replace the contents with (item_id, key) entries in O(n)."""
+        self._heap = [[key, item_id] for item_id, key in entries]
+        heapq.heapify(self._heap)
+        self._pos = {entry[1]: idx for idx, entry in enumerate(self._heap)}
+
+    def update(self, item_id: Hashable, key: Any):
+        idx = self._pos[item_id]
+        old_key = self._heap[idx][0]
+        self._heap[idx][0] = key
+        if key < old_key:
+            self._sift_up(idx)
+        else:
+            self._sift_down(idx)
+
+    def remove(self, item_id: Hashable):
+        idx = self._pos.pop(item_id)
+        last = self._heap.pop()
+        if idx < len(self._heap):
+            self._heap[idx] = last
+            self._pos[last[1]] = idx
+            self._sift_up(idx)
+            self._sift_down(self._pos[last[1]])
+
+    def peek(self) -> Tuple[Hashable, Any]:
+        key, item_id = self._heap[0]
+        return item_id, key
+
+    def nsmallest(self, count: int) -> List[Tuple[Hashable, Any]]:
+        """The `count` smallest (item_id, key) entries, smallest first."""
+        return [(item_id, key) for key, item_id in heapq.nsmallest(count, self._heap)]
+
+    def pop(self) -> Hashable:
+        item_id = self._heap[0][1]
+        self.remove(item_id)
+        return item_id
+
+    def clear(self):
+        self._heap.clear()
+        self._pos.clear()
+
+    def _sift_up(self, idx: int):
+        heap, pos = self._heap, self._pos
+        entry = heap[idx]
+        while idx > 0:
+            parent = (idx - 1) >> 1
+            if heap[parent][0] <= entry[0]:
+                break
+            heap[idx] = heap[parent]
+            pos[heap[idx][1]] = idx
+            idx = parent
+        heap[idx] = entry
+        pos[entry[1]] = idx
+
+    def _sift_down(self, idx: int):
+        heap, pos = self._heap, self._pos
+        size = len(heap)
+        entry = heap[idx]
+        while True:
+            child = 2 * idx + 1
+            if child >= size:
+                break
+            right = child + 1
+            if right < size and heap[right][0] < heap[child][0]:
+                child = right
+            if entry[0] <= heap[child][0]:
+                break
+            heap[idx] = heap[child]
+            pos[heap[idx][1]] = idx
+            idx = child
+        heap[idx] = entry
+        pos[entry[1]] = idx
@@ -1,34 +1,180 @@
 # memory/lru_memory.py
 
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
 from collections import OrderedDict
+from memory.multi_match import MultiMatcher
 from memory.base_memory import BaseMemory
+from memory.ngram_index import NgramIndex
+from memory.query_cache import QueryCache
+from memory.snapshot import Snapshot, pack_records
+from memory.wal import WriteAheadLog
 
 
 class LRUMemory(BaseMemory):
-    def __init__(self, capacity: int):
-        super().__init__(capacity)
+    def __init__(
+        self,
+        capacity: int,
+        use_index: bool = False,
+        low_watermark: Optional[int] = None,
+        query_cache: QueryCache = None,
+        wal: WriteAheadLog = None,
+    ):
+        super().__init__(capacity, low_watermark)
         # OrderedDict handles LRU logic automatically
         self.cache = OrderedDict()
+        self.wal = wal
+        # Optional trigram index and query cache. Matches come back
+        # unordered, so each key carries a recency tick that mirrors its
+        # position in the cache.
+        self._index = NgramIndex() if use_index else None
+        self.query_cache = query_cache
+        self._keyed = use_index or query_cache is not None
+        self._ticks: Dict[str, int] = {}
+        self._clock = 0
+
+    def _touch(self, key: str):
+        if self.wal is not None:
+            self.wal.log_access(key, 0.0)
+        self.cache.move_to_end(key)
+        if self._keyed:
+            self._clock += 1
+            self._ticks[key] = self._clock
 
     def add(self, memory: Dict[str, Any]):
         # Use content string as key for simulation
         key = memory["content"]
+        self._inserts += 1
         if key in self.cache:
-            self.cache.move_to_end(key)  # Mark as recently used
+            self._touch(key)  # Mark as recently used
         else:
-            self.cache[key] = memory
+            self._insert(key, memory)
             if len(self.cache) > self.capacity:
-                self.cache.popitem(last=False)  # Evict first item (Least Recently Used)
+                started = time.perf_counter()
+                count = self._overflow(len(self.cache))
+                self._evict_oldest(count)
+                self._record_eviction(count, started)
+
+    def _insert(self, key: str, memory: Dict[str, Any]):
+        if self.wal is not None:
+            self.wal.log_add(key, memory)
+        self.cache[key] = memory
+        if self._keyed:
+            if self._index is not None:
+                self._index.add(key, key)
+            if self.query_cache is not None:
+                self.query_cache.added(key, key.lower())
+            self._clock += 1
+            self._ticks[key] = self._clock
+
+    def _evict_oldest(self, count: int):
+        for _ in range(count):
+            evicted_key, _ = self.cache.popitem(last=False)  # Evict first item (Least Recently Used)
+            if self.wal is not None:
+                self.wal.log_evict(evicted_key)
+            if self._keyed:
+                if self._index is not None:
+                    self._index.remove(evicted_key)
+                if self.query_cache is not None:
+                    self.query_cache.removed(evicted_key)
+                del self._ticks[evicted_key]
 
     def retrieve(self, query: str, top_k: int = 1, current_time: float = None) -> List[Dict[str, Any]]:
+        if self._keyed:
+            matches = sorted(self._search(query), key=self._ticks.__getitem__)
+            results = []
+            for key in matches:
+                self._touch(key)
+                results.append(self.cache[key])
+            return results[-top_k:][::-1]
+
         results = []
         # Iterate over items to find matches
         for key, memory in list(self.cache.items()):  # Cast to list to avoid runtime errors
             if query.lower() in memory["content"].lower():
-                self.cache.move_to_end(key)  # Update recency on read
+                self._touch(key)  # Update recency on read
                 results.append(memory)
         return results[-top_k:][::-1]  # Return most recent matches
 
+    def retrieve_many(
+        self, queries: List[str], top_k: int = 1, current_time: float = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        retrieve() for each query in order, matching every query in one pass
+        over the cache. Each query still refreshes its matches, so later
+        queries see the recency order earlier ones left behind.
+        """
+        if self._keyed or len(queries) < 2:
+            return super().retrieve_many(queries, top_k, current_time)
+        lowered = [query.lower() for query in queries]
+        patterns = list(dict.fromkeys(lowered))
+        position = {pattern: i for i, pattern in enumerate(patterns)}
+        keys = list(self.cache)
+        per_pattern = MultiMatcher(patterns).match(keys, [key.lower() for key in keys])
+
+        # Position of each matched key in the recency order, updated as
+        # queries move their matches to the end
+        ticks = {key: tick for tick, key in enumerate(self.cache)}
+        clock = len(ticks)
+        results = []
+        for q in lowered:
+            matched = []
+            for key in sorted(per_pattern[position[q]], key=ticks.__getitem__):
+                self._touch(key)  # Update recency on read
+                ticks[key] = clock
+                clock += 1
+                matched.append(self.cache[key])
+            results.append(matched[-top_k:][::-1])
+        return results
+
+    def _search(self, query: str):
+        if self.query_cache is None:
+            return self._index.search(query)
+        q = query.lower()
+        keys = self.query_cache.get(q)
+        if keys is None:
+            if self._index is not None:
+                keys = self._index.search(query)
+            else:
+                keys = {key for key in self.cache if q in key.lower()}
+            self.query_cache.put(q, keys)
+        return keys
+
+    def _replay(self, op: int, key: Any, time: float, memory: Optional[Dict[str, Any]]):
+        if op == WriteAheadLog.ADD:
+            self._insert(memory["content"], memory)
+            self._inserts += 1
+        elif op == WriteAheadLog.ACCESS:
+            self._touch(key)
+        else:
+            self._evict_oldest(1)
+            self._evicted += 1
+
+    def _snapshot(self):
+        config = {"capacity": self.capacity, "use_index": self._index is not None, "low_watermark": self.low_watermark}
+        state = self._cost_state()
+        arrays = {}
+        # Least recently used first, like the cache itself
+        pack_records(arrays, state, "items.", list(self.cache.values()))
+        return config, state, arrays
+
+    @classmethod
+    def _from_snapshot(cls, snapshot: Snapshot, query_cache: QueryCache = None) -> "LRUMemory":
+        memory = cls(**snapshot.config, query_cache=query_cache)
+        memory._restore_cost_state(snapshot.state)
+        if query_cache is not None:
+            query_cache.clear()
+        for item in snapshot.records("items."):
+            memory._insert(item["content"], item)
+        return memory
+
     def stats(self):
-        return {"size": len(self.cache), "capacity": self.capacity}
+        stats = {
+            "size": len(self.cache),
+            "capacity": self.capacity,
+            "low_watermark": self.low_watermark,
+            "eviction_cost": self.eviction_cost(),
+        }
+        if self.query_cache is not None:
+            stats["query_cache"] = self.query_cache.stats()
+        return stats
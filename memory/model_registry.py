@@ -0,0 +1,38 @@
+# memory/model_registry.py
+
+import threading
+from typing import Any, Dict
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+_models: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def get_model(name: str = DEFAULT_MODEL):
+    """
+    Return the process-wide SentenceTransformer for `name`, loading it on
+    first use.
+
+    sentence_transformers is imported here rather than at module import, so
+    code that never encodes text never pays for torch/transformers.
+    """
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(name)
+                _models[name] = model
+    return model
+
+
+def loaded_models() -> Dict[str, Any]:
+    return dict(_models)
+
+
+def clear():
+    """Drop all cached models (mainly to free memory between runs)."""
+    with _lock:
+        _models.clear()
@@ -0,0 +1,83 @@
+# memory/multi_match.py
+
+from typing import Hashable, List, Optional, Sequence
+
+
+class MultiMatcher:
+    """
+    Matches a set of substring patterns against many texts in one pass.
+
+    match() joins the texts into a single NUL-separated string, then finds
+    each pattern with repeated C-level str.find() calls over that string
+    and maps every hit back to its item by counting separators. Per-item Python work is paid once for the whole
+    query set instead of once per query. Matching is case-sensitive;
+    callers lowercase both sides for case-insensitive lookup. Texts that
+    contain the separator themselves are matched one by one instead.
+
+    A pure-Python Aho-Corasick automaton does the same in a single scan
+    over the characters, but stepping it costs far more per character than
+    str.find(), so it only wins with hundreds of patterns.
+    """
+
+    SEPARATOR = "\x00"
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def match(self, keys: Sequence[Hashable], texts: Sequence[str]) -> List[List[Hashable]]:
+        """
+        Per pattern, the keys whose text contains it, in input order.
+        `keys` and `texts` are parallel sequences.
+        """
+        joined = self.join(texts)
+        if joined is None:
+            return self.match_each(keys, texts)
+        return self.match_joined(keys, joined)
+
+    @classmethod
+    def join(cls, texts: Sequence[str]) -> Optional[str]:
+        """`texts` joined with SEPARATOR, or None if one of them contains it."""
+        joined = cls.SEPARATOR.join(texts)
+        if joined.count(cls.SEPARATOR) != max(len(texts) - 1, 0):
+            return None
+        return joined
+
+    def match_each(self, keys: Sequence[Hashable], texts: Sequence[str]) -> List[List[Hashable]]:
+        """match() text by text, for texts that cannot be joined."""
+        return [[key for key, text in zip(keys, texts) if pattern in text] for pattern in self.patterns]
+
+    def match_joined(self, keys: Sequence[Hashable], joined: str) -> List[List[Hashable]]:
+        """match() for texts already joined by join(), e.g. by a caller that reuses them."""
+        sep = self.SEPARATOR
+        if joined.count(sep) != max(len(keys) - 1, 0):
+            raise ValueError("joined must hold one text per key, none containing SEPARATOR")
+        matches: List[List[Hashable]] = []
+        for pattern in self.patterns:
+            if not pattern:
+                matches.append(list(keys))
+                continue
+            if sep in pattern:
+                texts = joined.split(sep)
+                matches.append([key for key, text in zip(keys, texts) if pattern in text])
+                continue
+            hits = []
+            find, count = joined.find, joined.count
+            # `index` is the text that starts at `pos`; separators skipped
+            # over since then advance it
+            index = pos = 0
+            start = find(pattern)
+            while start != -1:
+                index += count(sep, pos, start)
+                hits.append(keys[index])
+                # Resume at the next text so each item is reported once
+                end = find(sep, start)
+                if end == -1:
+                    break
+                index += 1
+                pos = end + 1
+                start = find(pattern, pos)
+            matches.append(hits)
+        return matches
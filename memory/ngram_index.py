@@ -0,0 +1,85 @@
+# memory/ngram_index.py
+
+from typing import Dict, Hashable, Iterable, Set
+
+
+class NgramIndex:
+    """
+    Inverted character n-gram index for case-insensitive substring lookup.
+
+    Every stored content string is lowercased once and split into its
+    n-grams. A query is answered by intersecting the posting sets of its own
+    n-grams (smallest first) and then running the exact
+    `query.lower() in content.lower()` check on the few survivors, so results
+    are identical to a full scan. Queries shorter than n fall back to a scan
+    over the cached lowercase strings.
+    """
+
+    def __init__(self, n: int = 3):
+        if n < 1:
+            raise ValueError("n must be >= 1")
+        self.n = n
+        self._postings: Dict[str, Set[Hashable]] = {}
+        self._lowered: Dict[Hashable, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._lowered)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._lowered
+
+    def _grams(self, text: str) -> Set[str]:
+        n = self.n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def lowered(self, key: Hashable) -> str:
+        return self._lowered[key]
+
+    def add(self, key: Hashable, content: str):
+        if key in self._lowered:
+            self.remove(key)
+        lowered = content.lower()
+        self._lowered[key] = lowered
+        postings = self._postings
+        for gram in self._grams(lowered):
+            bucket = postings.get(gram)
+            if bucket is None:
+                postings[gram] = {key}
+            else:
+                bucket.add(key)
+
+    def remove(self, key: Hashable):
+        lowered = self._lowered.pop(key, None)
+        if lowered is None:
+            return
+        postings = self._postings
+        for gram in self._grams(lowered):
+            bucket = postings.get(gram)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del postings[gram]
+
+    def candidates(self, query_lower: str) -> Iterable[Hashable]:
+        """Keys that contain every n-gram of the (already lowercased) query."""
+        if len(query_lower) < self.n:
+            return self._lowered.keys()
+        buckets = []
+        for gram in self._grams(query_lower):
+            bucket = self._postings.get(gram)
+            if bucket is None:
+                return ()
+            buckets.append(bucket)
+        buckets.sort(key=len)
+        result = buckets[0]
+        for bucket in buckets[1:]:
+            result = result & bucket
+            if not result:
+                break
+        return result
+
+    def search(self, query: str) -> Set[Hashable]:
+        """Keys whose content contains `query`, case-insensitively."""
+        q = query.lower()
+        lowered = self._lowered
+        return {key for key in self.candidates(q) if q in lowered[key]}
@@ -0,0 +1,104 @@
+# memory/query_cache.py
+
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of query -> keys of the items whose content matches.
+
+    The owning memory reports every insert and eviction through added()
+    and removed(); each report bumps `generation` and is appended to a
+    change log. A cached entry remembers the generation it was last
+    brought up to date at, and a lookup replays only the changes made
+    since then (one substring check per insert), so a repeated query costs
+    O(changes) instead of a scan over the whole memory. Entries that fall
+    behind the retained log are dropped and recomputed.
+
+    Only the match set is cached. Ranking and access bookkeeping stay with
+    the caller on every retrieve, so time-dependent scores never go stale.
+
+    Args:
+        max_entries: Maximum number of cached queries
+        max_log: Changes retained for patching entries
+    """
+
+    def __init__(self, max_entries: int = 256, max_log: int = 4096):
+        if max_entries < 1 or max_log < 1:
+            raise ValueError("max_entries and max_log must be >= 1")
+        self.max_entries = max_entries
+        self.max_log = max_log
+        self.generation = 0
+        self._entries: "OrderedDict[str, List]" = OrderedDict()  # query -> [generation, keys]
+        # Change i (1-based generation) is _log[i - 1 - _log_start]:
+        # (key, lowered content) for an insert, (key, None) for a removal
+        self._log: List[Tuple[Hashable, Optional[str]]] = []
+        self._log_start = 0
+        self.hits = 0
+        self.misses = 0
+        self.patched = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def added(self, key: Hashable, lowered: str):
+        self._append((key, lowered))
+
+    def removed(self, key: Hashable):
+        self._append((key, None))
+
+    def _append(self, change: Tuple[Hashable, Optional[str]]):
+        self.generation += 1
+        self._log.append(change)
+        if len(self._log) >= 2 * self.max_log:
+            drop = len(self._log) - self.max_log
+            del self._log[:drop]
+            self._log_start += drop
+
+    def get(self, query_lower: str) -> Optional[Set[Hashable]]:
+        """Keys matching the (lowercased) query, or None on a miss."""
+        entry = self._entries.get(query_lower)
+        if entry is None:
+            self.misses += 1
+            return None
+        generation, keys = entry
+        if generation < self._log_start:
+            # Older than the retained log; can no longer be patched
+            del self._entries[query_lower]
+            self.misses += 1
+            return None
+        if generation < self.generation:
+            for key, lowered in self._log[generation - self._log_start:]:
+                if lowered is None:
+                    keys.discard(key)
+                elif query_lower in lowered:
+                    keys.add(key)
+            entry[0] = self.generation
+            self.patched += 1
+        self._entries.move_to_end(query_lower)
+        self.hits += 1
+        return keys
+
+    def put(self, query_lower: str, keys: Set[Hashable]):
+        self._entries[query_lower] = [self.generation, set(keys)]
+        self._entries.move_to_end(query_lower)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self._log.clear()
+        self._log_start = self.generation
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "patched": self.patched,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
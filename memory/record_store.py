@@ -0,0 +1,257 @@
+# memory/record_store.py
+
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from memory.multi_match import MultiMatcher
+
+
+class RecordStore:
+    """
+    Struct-of-arrays storage for memory items.
+
+    Numeric fields live in parallel NumPy columns indexed by slot, content
+    strings are interned in a reference-counted table, and callers get
+    MemoryRecord views instead of per-item dicts. Freed slots are reused and
+    the columns double in size when full.
+    """
+
+    FLOAT_FIELDS = ("timestamp", "impact", "last_access_time")
+    INT_FIELDS = ("access_count",)
+
+    def __init__(self, initial_rows: int = 1024):
+        rows = max(1, initial_rows)
+        self.timestamp = np.zeros(rows, dtype=np.float64)
+        self.impact = np.zeros(rows, dtype=np.float64)
+        self.last_access_time = np.zeros(rows, dtype=np.float64)
+        self.access_count = np.zeros(rows, dtype=np.int64)
+        self.content_id = np.full(rows, -1, dtype=np.int64)
+        self.item_id = np.full(rows, -1, dtype=np.int64)  # -1 marks a free slot
+        self._free_slots: List[int] = list(range(rows - 1, -1, -1))
+        # Interned content table
+        self._contents: List[str] = []
+        self._lowered: List[str] = []
+        self._content_refs: List[int] = []
+        self._content_ids: Dict[str, int] = {}
+        self._free_content_ids: List[int] = []
+        # Rarely used non-standard keys, per slot
+        self._extras: Dict[int, Dict[str, Any]] = {}
+
+    @property
+    def rows(self) -> int:
+        return self.item_id.shape[0]
+
+    def __len__(self) -> int:
+        return self.rows - len(self._free_slots)
+
+    def _grow(self):
+        old = self.rows
+        new = old * 2
+        for name in ("timestamp", "impact", "last_access_time", "access_count"):
+            column = getattr(self, name)
+            grown = np.zeros(new, dtype=column.dtype)
+            grown[:old] = column
+            setattr(self, name, grown)
+        for name in ("content_id", "item_id"):
+            column = getattr(self, name)
+            grown = np.full(new, -1, dtype=column.dtype)
+            grown[:old] = column
+            setattr(self, name, grown)
+        self._free_slots.extend(range(new - 1, old - 1, -1))
+
+    def _intern(self, content: str) -> int:
+        cid = self._content_ids.get(content)
+        if cid is not None:
+            self._content_refs[cid] += 1
+            return cid
+        if self._free_content_ids:
+            cid = self._free_content_ids.pop()
+            self._contents[cid] = content
+            self._lowered[cid] = content.lower()
+            self._content_refs[cid] = 1
+        else:
+            cid = len(self._contents)
+            self._contents.append(content)
+            self._lowered.append(content.lower())
+            self._content_refs.append(1)
+        self._content_ids[content] = cid
+        return cid
+
+    def _release_content(self, cid: int):
+        self._content_refs[cid] -= 1
+        if self._content_refs[cid] == 0:
+            del self._content_ids[self._contents[cid]]
+            self._contents[cid] = None
+            self._lowered[cid] = None
+            self._free_content_ids.append(cid)
+
+    def insert(self, item_id: int, memory: Dict[str, Any]) -> "MemoryRecord":
+        if not self._free_slots:
+            self._grow()
+        slot = self._free_slots.pop()
+        self.item_id[slot] = item_id
+        self.content_id[slot] = self._intern(memory["content"])
+        self.timestamp[slot] = memory.get("timestamp", 0.0)
+        self.impact[slot] = memory.get("impact", 0)
+        self.access_count[slot] = memory.get("access_count", 0)
+        self.last_access_time[slot] = memory.get("last_access_time", self.timestamp[slot])
+        extras = {k: v for k, v in memory.items() if k not in MemoryRecord.KEYS}
+        if extras:
+            self._extras[slot] = extras
+        return MemoryRecord(self, slot, item_id)
+
+    def remove(self, slot: int):
+        self._release_content(int(self.content_id[slot]))
+        self.item_id[slot] = -1
+        self.content_id[slot] = -1
+        self._extras.pop(slot, None)
+        self._free_slots.append(slot)
+
+    def restore(self, columns: Dict[str, np.ndarray], contents: List[str], extras: Dict[int, Dict[str, Any]]):
+        """
+        Adopt saved columns as they are (e.g. memory-mapped snapshot
+        arrays) and rebuild the content table from `contents`, indexed by
+        content id.
+        """
+        for name, column in columns.items():
+            setattr(self, name, column)
+        refs = np.bincount(self.content_id[self.content_id >= 0], minlength=len(contents)).tolist()
+        self._contents = [c if n else None for c, n in zip(contents, refs)]
+        self._lowered = [c.lower() if c is not None else None for c in self._contents]
+        self._content_refs = refs
+        self._content_ids = {c: cid for cid, c in enumerate(self._contents) if c is not None}
+        self._free_content_ids = [cid for cid, n in enumerate(refs) if not n]
+        self._free_slots = np.flatnonzero(self.item_id < 0)[::-1].tolist()
+        self._extras = extras
+
+    def content(self, slot: int) -> str:
+        return self._contents[self.content_id[slot]]
+
+    def match_slots(self, query_lower: str) -> np.ndarray:
+        """
+        Occupied slots whose content contains `query_lower`, ordered by
+        item_id. Each distinct content string is checked once.
+        """
+        lowered = self._lowered
+        cids = [cid for cid in self._content_ids.values() if query_lower in lowered[cid]]
+        if not cids:
+            return np.empty(0, dtype=np.intp)
+        slots = np.flatnonzero(np.isin(self.content_id, cids))
+        return slots[np.argsort(self.item_id[slots], kind="stable")]
+
+    def match_slots_many(self, matcher: MultiMatcher) -> List[np.ndarray]:
+        """match_slots() for every pattern of `matcher`, in one pass over the contents."""
+        lowered = self._lowered
+        cids = list(self._content_ids.values())
+        per_pattern = matcher.match(cids, list(map(lowered.__getitem__, cids)))
+        out = []
+        for cids in per_pattern:
+            if not cids:
+                out.append(np.empty(0, dtype=np.intp))
+                continue
+            slots = np.flatnonzero(np.isin(self.content_id, cids))
+            out.append(slots[np.argsort(self.item_id[slots], kind="stable")])
+        return out
+
+    def scores(self, current_time: float, w_freq: float, w_impact: float, decay_lambda: float) -> np.ndarray:
+        """Utility score of every slot at current_time; free slots score +inf."""
+        age = np.maximum(current_time - self.last_access_time, 0.0)
+        scores = (w_freq * self.access_count + w_impact * self.impact) * np.exp(-decay_lambda * age)
+        scores[self.item_id < 0] = np.inf
+        return scores
+
+    def eviction_keys(
+        self, current_time: float, w_freq: float, w_impact: float, decay_lambda: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        UtilityWeightedMemory._key of every slot as (tier, value) columns,
+        ages clamped at current_time: they order slots like scores() but
+        stay apart where exp() underflows. Free slots get tier 2.
+        """
+        base = w_freq * self.access_count + w_impact * self.impact
+        tier = np.sign(base).astype(np.int8)
+        with np.errstate(divide="ignore"):
+            value = np.log(np.abs(base)) + decay_lambda * np.minimum(self.last_access_time, current_time)
+        np.negative(value, out=value, where=tier < 0)
+        value[tier == 0] = 0.0
+        tier[self.item_id < 0] = 2
+        return tier, value
+
+    def nbytes(self) -> int:
+        columns = (self.timestamp, self.impact, self.last_access_time,
+                   self.access_count, self.content_id, self.item_id)
+        return sum(column.nbytes for column in columns)
+
+
+class MemoryRecord(MutableMapping):
+    """
+    Dict-compatible view of one RecordStore slot.
+
+    Reads and writes go straight to the store's columns. A view outlives
+    its item only until the slot is reused; use to_dict() to keep a copy.
+    """
+
+    __slots__ = ("_store", "_slot", "_item_id")
+
+    KEYS = ("content", "timestamp", "impact", "access_count", "last_access_time")
+
+    def __init__(self, store: RecordStore, slot: int, item_id: int):
+        self._store = store
+        self._slot = slot
+        self._item_id = item_id
+
+    @property
+    def slot(self) -> int:
+        return self._slot
+
+    def _check(self):
+        if self._store.item_id[self._slot] != self._item_id:
+            raise LookupError(f"memory {self._item_id} has been evicted")
+
+    def __getitem__(self, key: str) -> Any:
+        self._check()
+        store, slot = self._store, self._slot
+        if key == "content":
+            return store.content(slot)
+        if key in RecordStore.FLOAT_FIELDS:
+            return float(getattr(store, key)[slot])
+        if key in RecordStore.INT_FIELDS:
+            return int(getattr(store, key)[slot])
+        extras = store._extras.get(slot)
+        if extras is None or key not in extras:
+            raise KeyError(key)
+        return extras[key]
+
+    def __setitem__(self, key: str, value: Any):
+        self._check()
+        store, slot = self._store, self._slot
+        if key == "content":
+            store._release_content(int(store.content_id[slot]))
+            store.content_id[slot] = store._intern(value)
+        elif key in RecordStore.FLOAT_FIELDS or key in RecordStore.INT_FIELDS:
+            getattr(store, key)[slot] = value
+        else:
+            store._extras.setdefault(slot, {})[key] = value
+
+    def __delitem__(self, key: str):
+        self._check()
+        extras = self._store._extras.get(self._slot)
+        if key in self.KEYS or not extras or key not in extras:
+            raise KeyError(key)
+        del extras[key]
+
+    def __iter__(self) -> Iterator[str]:
+        self._check()
+        yield from self.KEYS
+        yield from self._store._extras.get(self._slot, ())
+
+    def __len__(self) -> int:
+        return len(self.KEYS) + len(self._store._extras.get(self._slot, ()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"MemoryRecord({self.to_dict()!r})"
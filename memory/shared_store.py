@@ -0,0 +1,379 @@
+# memory/shared_store.py
+
+import contextlib
+import re
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from memory.record_store import RecordStore
+
+MAGIC = b"UWMSHM01"
+# Immutable part of the header: magic, rows, arena bytes, w_freq, w_impact,
+# whether only returned items are credited (access_policy="returned")
+_HEADER = struct.Struct("<8sQQddQ")
+_COUNTERS_AT = 64  # uint64 sequence number, text arena end, lower arena end
+HEADER_BYTES = 128
+# Per-slot columns, then the per-content table; all 8 bytes wide
+SLOT_COLUMNS = (
+    ("timestamp", np.float64),
+    ("impact", np.float64),
+    ("last_access_time", np.float64),
+    ("access_count", np.int64),
+    ("content_id", np.int64),
+    ("item_id", np.int64),
+)
+CONTENT_COLUMNS = ("text_offset", "text_length", "lower_offset", "lower_length", "content_refs")
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        # Python 3.13+: a reader must not unlink the segment when it exits
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Older versions always track; readers started by multiprocessing
+        # share the owner's resource tracker, so this stays harmless
+        return shared_memory.SharedMemory(name=name)
+
+
+def _layout(buf, rows: int, arena_bytes: int) -> Dict[str, Any]:
+    """Views of every column, the counters and both arenas inside `buf`."""
+    views: Dict[str, Any] = {"_counters": np.ndarray(3, dtype=np.uint64, buffer=buf, offset=_COUNTERS_AT)}
+    offset = HEADER_BYTES
+    for name, dtype in SLOT_COLUMNS + tuple((name, np.int64) for name in CONTENT_COLUMNS):
+        views[name] = np.ndarray(rows, dtype=dtype, buffer=buf, offset=offset)
+        offset += rows * 8
+    views["_text"] = np.ndarray(arena_bytes, dtype=np.uint8, buffer=buf, offset=offset)
+    views["_lower"] = np.ndarray(arena_bytes, dtype=np.uint8, buffer=buf, offset=offset + arena_bytes)
+    return views
+
+
+def _segment_bytes(rows: int, arena_bytes: int) -> int:
+    return HEADER_BYTES + rows * 8 * (len(SLOT_COLUMNS) + len(CONTENT_COLUMNS)) + 2 * arena_bytes
+
+
+class SharedRecordStore(RecordStore):
+    """
+    RecordStore whose columns live in a multiprocessing.shared_memory segment.
+
+    The segment holds a fixed number of slot rows, a content table (byte
+    offsets, lengths and reference counts) and two content arenas: the
+    UTF-8 text and its lowercase form, NUL-separated so readers can run
+    substring matches straight over it. The arenas are bump-allocated and
+    compacted in place when full; the rows never grow.
+
+    One process owns and writes the store (backend="shared" of
+    UtilityWeightedMemory); any number of SharedMemoryReader processes
+    attach to it by name. Structural writes (insert, remove, content
+    changes, compaction) bump a sequence number to odd before and back to
+    even after, and readers retry a query whose sequence number was odd or
+    changed underneath it. Access counter updates are not fenced: a reader
+    may rank with a count that is one batch old.
+
+    Args:
+        rows: Slots in the segment (the memory's capacity)
+        arena_bytes: Bytes per content arena (default ARENA_BYTES_PER_ROW * rows)
+        w_freq, w_impact, access_policy: The owning memory's ranking
+            settings, published in the header for readers
+    """
+
+    ARENA_BYTES_PER_ROW = 256
+
+    def __init__(
+        self,
+        rows: int,
+        arena_bytes: Optional[int] = None,
+        w_freq: float = 0.4,
+        w_impact: float = 0.6,
+        access_policy: str = "all",
+    ):
+        rows = max(1, rows)
+        if arena_bytes is None:
+            arena_bytes = self.ARENA_BYTES_PER_ROW * rows
+        self._shm = shared_memory.SharedMemory(create=True, size=_segment_bytes(rows, arena_bytes))
+        _HEADER.pack_into(
+            self._shm.buf, 0, MAGIC, rows, arena_bytes, w_freq, w_impact, access_policy == "returned"
+        )
+        for name, view in _layout(self._shm.buf, rows, arena_bytes).items():
+            setattr(self, name, view)
+        self._counters[:] = 0
+        self.content_id[:] = -1
+        self.item_id[:] = -1
+        self.content_refs[:] = 0
+        self.arena_bytes = arena_bytes
+        self._free_slots: List[int] = list(range(rows - 1, -1, -1))
+        # Writer-side copy of the content table for matching and lookups
+        self._contents: List[str] = []
+        self._lowered: List[str] = []
+        self._content_refs = self.content_refs
+        self._content_ids: Dict[str, int] = {}
+        self._free_content_ids: List[int] = []
+        self._extras: Dict[int, Dict[str, Any]] = {}
+        self._depth = 0
+        self.compactions = 0
+
+    @property
+    def name(self) -> str:
+        """Segment name to pass to SharedMemoryReader."""
+        return self._shm.name
+
+    @contextlib.contextmanager
+    def _writing(self):
+        # Seqlock write section; nested sections only fence once
+        self._depth += 1
+        if self._depth == 1:
+            self._counters[0] += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self._counters[0] += 1
+
+    def _grow(self):
+        raise MemoryError(f"shared store is full ({self.rows} rows)")
+
+    def _allocate(self, text_len: int, lower_len: int):
+        """Arena offsets for a new entry, compacting the arenas if needed."""
+        text_end, lower_end = int(self._counters[1]), int(self._counters[2])
+        if max(text_end + text_len, lower_end + lower_len) > self.arena_bytes:
+            self._compact()
+            text_end, lower_end = int(self._counters[1]), int(self._counters[2])
+            if max(text_end + text_len, lower_end + lower_len) > self.arena_bytes:
+                raise MemoryError(f"shared content arena is full ({self.arena_bytes} bytes)")
+        self._counters[1] = text_end + text_len
+        self._counters[2] = lower_end + lower_len
+        return text_end, lower_end
+
+    def _compact(self):
+        """Move live entries to the front of both arenas, in arena order."""
+        cids = np.array(sorted(self._content_ids.values()), dtype=np.int64)
+        ends = [0, 0]
+        if len(cids):
+            cids = cids[np.argsort(self.text_offset[cids])]
+            for i, (arena, offset, length) in enumerate((
+                (self._text, self.text_offset, self.text_length),
+                (self._lower, self.lower_offset, self.lower_length),
+            )):
+                starts, lengths = offset[cids], length[cids]
+                packed = np.concatenate([arena[s:s + n] for s, n in zip(starts.tolist(), lengths.tolist())])
+                arena[:len(packed)] = packed
+                offset[cids] = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+                ends[i] = len(packed)
+        self._counters[1], self._counters[2] = ends
+        self.compactions += 1
+
+    def _intern(self, content: str) -> int:
+        cid = self._content_ids.get(content)
+        if cid is not None:
+            self._content_refs[cid] += 1
+            return cid
+        lowered = content.lower()
+        text = content.encode("utf-8")
+        lower = lowered.encode("utf-8") + b"\0"  # matches never span entries
+        with self._writing():
+            text_at, lower_at = self._allocate(len(text), len(lower))
+            self._text[text_at:text_at + len(text)] = np.frombuffer(text, dtype=np.uint8)
+            self._lower[lower_at:lower_at + len(lower)] = np.frombuffer(lower, dtype=np.uint8)
+            if self._free_content_ids:
+                cid = self._free_content_ids.pop()
+                self._contents[cid] = content
+                self._lowered[cid] = lowered
+            else:
+                cid = len(self._contents)
+                self._contents.append(content)
+                self._lowered.append(lowered)
+            self.text_offset[cid], self.text_length[cid] = text_at, len(text)
+            self.lower_offset[cid], self.lower_length[cid] = lower_at, len(lower)
+            self._content_refs[cid] = 1
+        self._content_ids[content] = cid
+        return cid
+
+    def _release_content(self, cid: int):
+        with self._writing():
+            super()._release_content(cid)
+
+    def insert(self, item_id: int, memory: Dict[str, Any]):
+        with self._writing():
+            return super().insert(item_id, memory)
+
+    def remove(self, slot: int):
+        with self._writing():
+            super().remove(slot)
+
+    def restore(self, columns: Dict[str, np.ndarray], contents: List[str], extras: Dict[int, Dict[str, Any]]):
+        """Copy saved columns into the segment and re-intern their contents."""
+        item_id = np.asarray(columns["item_id"])
+        if np.any(item_id[self.rows:] >= 0):
+            raise ValueError(f"snapshot has items beyond the shared store's {self.rows} rows")
+        n = min(len(item_id), self.rows)
+        saved_cids = np.asarray(columns["content_id"])[:n]
+        with self._writing():
+            for name, column in columns.items():
+                target = getattr(self, name)
+                target[:n] = column[:n]
+                target[n:] = -1 if name in ("content_id", "item_id") else 0
+            self._counters[1:] = 0
+            self.content_refs[:] = 0
+            self._contents, self._lowered = [], []
+            self._content_ids, self._free_content_ids = {}, []
+            used = saved_cids >= 0
+            counts = np.bincount(saved_cids[used], minlength=len(contents))
+            # At least one entry so empty stores can index it below
+            remap = np.full(max(len(contents), 1), -1, dtype=np.int64)
+            for old in np.flatnonzero(counts).tolist():
+                remap[old] = self._intern(contents[old])
+                self._content_refs[remap[old]] = counts[old]
+            self.content_id[:n] = np.where(used, remap[np.where(used, saved_cids, 0)], -1)
+        self._free_slots = np.flatnonzero(self.item_id < 0)[::-1].tolist()
+        self._extras = extras
+
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "segment_bytes": self._shm.size,
+            "text_arena_used": int(self._counters[1]),
+            "lower_arena_used": int(self._counters[2]),
+            "arena_bytes": self.arena_bytes,
+            "compactions": self.compactions,
+            "sequence": int(self._counters[0]),
+        }
+
+    def close(self):
+        """Release and unlink the segment; the store is unusable afterwards."""
+        for name in ("_counters", "_text", "_lower", "_content_refs") + tuple(
+            name for name, _ in SLOT_COLUMNS
+        ) + CONTENT_COLUMNS:
+            setattr(self, name, None)
+        self._shm.close()
+        self._shm.unlink()
+
+
+class SharedMemoryReader:
+    """
+    Read-only access to a shared UtilityWeightedMemory from another process.
+
+    Attaches to the segment of a backend="shared" memory by name and
+    answers retrieve() zero-copy: the query is matched with a regex
+    straight over the shared lowercase arena and ranked on the shared
+    columns; only the returned items are copied out, as dicts. Ranking
+    matches the owner's (every match scored as it will be once accessed,
+    ties by insertion order). Non-standard item keys stay with the owner.
+
+    Readers never write. With `accesses` set (e.g. a multiprocessing
+    Queue), each retrieve puts (item ids, current_time) for the items
+    the owner's access_policy would credit; the owner applies them with
+    UtilityWeightedMemory.apply_accesses().
+
+    Args:
+        name: SharedRecordStore.name of the owning memory
+        accesses: Object with put() receiving access batches, or None
+    """
+
+    def __init__(self, name: str, accesses=None):
+        self._shm = _attach(name)
+        magic, rows, arena_bytes, w_freq, w_impact, returned = _HEADER.unpack_from(self._shm.buf, 0)
+        if magic != MAGIC:
+            self._shm.close()
+            raise ValueError(f"{name} is not a shared memory store")
+        self.rows = rows
+        self.w_freq = w_freq
+        self.w_impact = w_impact
+        self.credit_returned = bool(returned)
+        self._views = _layout(self._shm.buf, rows, arena_bytes)
+        self.accesses = accesses
+        self.reads = 0
+        self.retries = 0
+
+    def _read(self, query):
+        # Seqlock read: run query() on a stable (even, unchanged) sequence
+        counters = self._views["_counters"]
+        while True:
+            before = int(counters[0])
+            if before & 1:
+                self.retries += 1
+                time.sleep(0)
+                continue
+            try:
+                result = query()
+            except (IndexError, ValueError, UnicodeDecodeError):
+                result = None  # torn read; retried below
+            if int(counters[0]) == before and result is not None:
+                self.reads += 1
+                return result
+            self.retries += 1
+
+    def _match_slots(self, query_lower: str) -> np.ndarray:
+        v = self._views
+        live = np.flatnonzero(v["content_refs"] > 0)
+        if query_lower:
+            starts = v["lower_offset"][live]
+            order = np.argsort(starts)
+            live, starts = live[order], starts[order]
+            pattern = re.compile(re.escape(query_lower.encode("utf-8")))
+            hits = np.fromiter(
+                (m.start() for m in pattern.finditer(v["_lower"], 0, int(v["_counters"][2]))), dtype=np.int64
+            )
+            if not len(hits):
+                return np.empty(0, dtype=np.intp)
+            entry = np.searchsorted(starts, hits, side="right") - 1
+            # Hits inside freed entries fall past the live entry before them
+            inside = (entry >= 0) & (hits < starts[entry] + v["lower_length"][live[entry]])
+            live = np.unique(live[entry[inside]])
+        slots = np.flatnonzero(np.isin(v["content_id"], live) & (v["item_id"] >= 0))
+        return slots[np.argsort(v["item_id"][slots], kind="stable")]
+
+    def _query(self, query_lower: str, top_k: int):
+        v = self._views
+        slots = self._match_slots(query_lower)
+        if not len(slots) or top_k <= 0:
+            return [], slots[:0]
+        ids = v["item_id"][slots]
+        scores = self.w_freq * (v["access_count"][slots] + 1) + self.w_impact * v["impact"][slots]
+        order = np.lexsort((ids, -scores))[:top_k]
+        text, text_offset, text_length = v["_text"], v["text_offset"], v["text_length"]
+        results = []
+        for slot in slots[order].tolist():
+            cid = int(v["content_id"][slot])
+            start = int(text_offset[cid])
+            results.append({
+                "content": text[start:start + int(text_length[cid])].tobytes().decode("utf-8"),
+                "timestamp": float(v["timestamp"][slot]),
+                "impact": float(v["impact"][slot]),
+                "access_count": int(v["access_count"][slot]),
+                "last_access_time": float(v["last_access_time"][slot]),
+            })
+        credited = ids[order] if self.credit_returned else ids
+        return results, credited
+
+    def retrieve(self, query: str, top_k: int = 1, current_time: float = None) -> List[Dict[str, Any]]:
+        if current_time is None:
+            current_time = time.time()
+        query_lower = query.lower()
+        results, credited = self._read(lambda: self._query(query_lower, top_k))
+        if self.accesses is not None and len(credited):
+            self.accesses.put((credited.tolist(), current_time))
+        return results
+
+    def retrieve_many(
+        self, queries: List[str], top_k: int = 1, current_time: float = None
+    ) -> List[List[Dict[str, Any]]]:
+        if current_time is None:
+            current_time = time.time()
+        return [self.retrieve(query, top_k, current_time) for query in queries]
+
+    def __len__(self) -> int:
+        return self._read(lambda: int(np.count_nonzero(self._views["item_id"] >= 0)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self._shm.name, "size": len(self), "reads": self.reads, "retries": self.retries}
+
+    def close(self):
+        self._views = None
+        self._shm.close()
@@ -1,12 +1,13 @@
 # memory/similarity_memory.py
 
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
 from memory.base_memory import BaseMemory
 
 
 class SimilarityOnlyMemory(BaseMemory):
-    def __init__(self, capacity: int):
-        super().__init__(capacity)
+    def __init__(self, capacity: int, low_watermark: Optional[int] = None):
+        super().__init__(capacity, low_watermark)
         self.memories: List[Dict[str, Any]] = []
 
     def _similarity(self, query: str, content: str) -> float:
@@ -16,10 +17,26 @@ class SimilarityOnlyMemory(BaseMemory):
         return len(q_tokens & c_tokens)
 
     def add(self, memory: Dict[str, Any]):
+        self._inserts += 1
         if len(self.memories) >= self.capacity:
-            self.memories.pop(0)  # naive eviction
+            started = time.perf_counter()
+            count = min(self._overflow(len(self.memories) + 1), len(self.memories))
+            del self.memories[:count]  # naive eviction
+            self._record_eviction(count, started)
         self.memories.append(memory)
 
+    def add_many(self, memories: List[Dict[str, Any]]):
+        memories = list(memories)
+        if self.capacity < 1 or self.low_watermark != self.capacity:
+            return super().add_many(memories)
+        # Same as popping from the front once per add, in one slice
+        self._inserts += len(memories)
+        overflow = max(0, len(self.memories) + len(memories) - self.capacity)
+        started = time.perf_counter()
+        self.memories = (self.memories + memories)[-self.capacity:]
+        if overflow:
+            self._record_eviction(overflow, started)
+
     def retrieve(self, query: str, top_k: int = 1, current_time: float = None) -> List[Dict[str, Any]]:
         scored = [
             (self._similarity(query, m["content"]), m)
@@ -31,5 +48,7 @@ class SimilarityOnlyMemory(BaseMemory):
     def stats(self):
         return {
             "size": len(self.memories),
-            "capacity": self.capacity
+            "capacity": self.capacity,
+            "low_watermark": self.low_watermark,
+            "eviction_cost": self.eviction_cost(),
         }
@@ -0,0 +1,128 @@
+# memory/sketch.py
+
+import hashlib
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+_MASK64 = (1 << 64) - 1
+
+
+class CountMinSketch:
+    """
+    Count-min sketch of string frequencies in a fixed (depth, width) table.
+
+    Each key is hashed once (blake2b) and mapped to one counter per row by
+    double hashing; add() bumps those counters and estimate() returns their
+    minimum, which never undercounts and overcounts by at most
+    e / width * total with probability 1 - exp(-depth).
+
+    With `reset_after` set, every counter is halved once that many
+    increments have been added since the last reset (TinyLFU aging), so old
+    popularity fades instead of saturating the table.
+
+    Args:
+        width: Counters per row
+        depth: Number of rows (independent hash functions)
+        reset_after: Increments between halvings (None = never age)
+        seed: Salt mixed into the hash
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 4, reset_after: Optional[int] = None, seed: int = 0):
+        if width < 1 or depth < 1:
+            raise ValueError("width and depth must be >= 1")
+        if reset_after is not None and reset_after < 1:
+            raise ValueError("reset_after must be >= 1")
+        self.width = width
+        self.depth = depth
+        self.reset_after = reset_after
+        self._salt = seed.to_bytes(8, "little", signed=True)
+        # Flat counters; _table is a (depth, width) NumPy view of the same
+        # buffer for vectorized updates, scalar updates go through the array
+        self._counts = array("q", bytes(8 * depth * width))
+        self._table = np.frombuffer(self._counts, dtype=np.int64).reshape(depth, width)
+        self._rows = np.arange(depth)
+        self._rows_u64 = self._rows.astype(np.uint64)
+        self.total = 0
+        self.resets = 0
+        self._since_reset = 0
+
+    def _hashes(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16, salt=self._salt).digest()
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def cells(self, key: str) -> List[int]:
+        """
+        Flat counter index of `key` in every row. Callers that both read
+        and bump a key can hash it once and use the *_cells methods.
+        """
+        h1, h2 = self._hashes(key)
+        width = self.width
+        return [row * width + ((h1 + row * h2) & _MASK64) % width for row in range(self.depth)]
+
+    def add(self, key: str, count: int = 1):
+        self.add_cells(self.cells(key), count)
+
+    def add_cells(self, cells: List[int], count: int = 1):
+        counts = self._counts
+        for cell in cells:
+            counts[cell] += count
+        self.total += count
+        if self.reset_after is not None:
+            self._since_reset += count
+            if self._since_reset >= self.reset_after:
+                self.halve()
+
+    def estimate(self, key: str) -> int:
+        return self.estimate_cells(self.cells(key))
+
+    def estimate_cells(self, cells: List[int]) -> int:
+        counts = self._counts
+        return min([counts[cell] for cell in cells])
+
+    def _columns_many(self, keys: List[str]) -> np.ndarray:
+        """(depth, len(keys)) counter columns: h1 + row * h2 (mod 2**64) mod width."""
+        hashes = np.array([self._hashes(key) for key in keys], dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            mixed = hashes[:, 0] + self._rows_u64[:, None] * hashes[:, 1]
+        return (mixed % np.uint64(self.width)).astype(np.intp)
+
+    def add_many(self, keys: Iterable[str]):
+        """add(key) for each key, with one table update."""
+        keys = list(keys)
+        if not keys:
+            return
+        np.add.at(self._table, (self._rows[:, None], self._columns_many(keys)), 1)
+        self.total += len(keys)
+        if self.reset_after is not None:
+            self._since_reset += len(keys)
+            if self._since_reset >= self.reset_after:
+                self.halve()
+
+    def estimate_many(self, keys: Iterable[str]) -> np.ndarray:
+        keys = list(keys)
+        if not keys:
+            return np.zeros(0, dtype=np.int64)
+        return self._table[self._rows[:, None], self._columns_many(keys)].min(axis=0)
+
+    def halve(self):
+        """Halve every counter (and the total), fading old counts."""
+        self._table >>= 1
+        self.total //= 2
+        self._since_reset = 0
+        self.resets += 1
+
+    def clear(self):
+        self._table[:] = 0
+        self.total = 0
+        self._since_reset = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "total": self.total,
+            "resets": self.resets,
+            "bytes": self._table.nbytes,
+        }
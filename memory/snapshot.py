@@ -0,0 +1,208 @@
+# memory/snapshot.py
+
+import json
+import os
+import struct
+from typing import Any, Dict, List, Mapping
+
+import numpy as np
+
+MAGIC = b"UWMSNAP1"
+VERSION = 1
+# Array sections start on this boundary so memory-mapped views are aligned
+ALIGN = 64
+_PREAMBLE = struct.Struct("<8sQQ")  # magic, header offset, header length
+
+# Numeric fields of a memory dict stored as columns; anything else is an
+# "extra" kept in the JSON header.
+RECORD_FIELDS = (
+    ("timestamp", np.float64),
+    ("impact", np.float64),
+    ("access_count", np.int64),
+    ("last_access_time", np.float64),
+)
+
+
+class Snapshot:
+    """
+    A snapshot file opened for restore.
+
+    The JSON header (kind, constructor config, scalar state) is parsed up
+    front. Arrays are views into one copy-on-write memory map of the file:
+    nothing is read until a page is touched, and writing to a restored
+    array copies that page privately instead of changing the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, header_offset, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a memory snapshot")
+            f.seek(header_offset)
+            self.header = json.loads(f.read(header_len).decode("utf-8"))
+        if self.header["version"] != VERSION:
+            raise ValueError(f"unsupported snapshot version {self.header['version']}")
+        self._map = None
+        if self.header["arrays"]:
+            # Plain ndarray views over the map: np.memmap's Python-level
+            # __getitem__ would slow down every element access
+            self._map = np.memmap(path, dtype=np.uint8, mode="c").view(np.ndarray)
+
+    @property
+    def kind(self) -> str:
+        return self.header["kind"]
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.header["config"]
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        return self.header["state"]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.header["arrays"]
+
+    def array(self, name: str) -> np.ndarray:
+        spec = self.header["arrays"][name]
+        dtype = np.dtype(spec["dtype"])
+        shape = tuple(spec["shape"])
+        nbytes = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+        offset = spec["offset"]
+        return self._map[offset:offset + nbytes].view(dtype).reshape(shape)
+
+    def strings(self, name: str) -> List[str]:
+        """Strings packed by pack_strings(name, ...)."""
+        text = self.array(name + ".blob").tobytes().decode("utf-8")
+        offsets = self.array(name + ".offsets").tolist()
+        return [text[start:end] for start, end in zip(offsets, offsets[1:])]
+
+    def records(self, prefix: str) -> List[Dict[str, Any]]:
+        """Memory dicts packed by pack_records(prefix, ...)."""
+        contents = self.strings(prefix + "content")
+        present = self.array(prefix + "present")
+        masks = np.unique(present).tolist()
+        records: List[Dict[str, Any]] = [None] * len(contents)
+        for mask in masks:
+            # Records with the same set of fields are built together
+            fields = [field for bit, (field, _) in enumerate(RECORD_FIELDS) if mask >> bit & 1]
+            keys = ("content", *fields)
+            if len(masks) == 1:
+                rows = np.arange(len(contents))
+                columns = [contents] + [self.array(prefix + field).tolist() for field in fields]
+            else:
+                rows = np.flatnonzero(present == mask)
+                columns = [[contents[i] for i in rows.tolist()]]
+                columns += [self.array(prefix + field)[rows].tolist() for field in fields]
+            for i, row in zip(rows.tolist(), zip(*columns)):
+                records[i] = dict(zip(keys, row))
+        for i, extra in self.state.get(prefix + "extras", {}).items():
+            records[int(i)].update(extra)
+        return records
+
+
+def pack_strings(arrays: Dict[str, np.ndarray], name: str, strings: List[str]):
+    """Store `strings` as one UTF-8 blob plus character offsets."""
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    if strings:
+        np.cumsum([len(s) for s in strings], out=offsets[1:])
+    arrays[name + ".blob"] = np.frombuffer("".join(strings).encode("utf-8"), dtype=np.uint8)
+    arrays[name + ".offsets"] = offsets
+
+
+def pack_records(
+    arrays: Dict[str, np.ndarray], state: Dict[str, Any], prefix: str, records: List[Mapping[str, Any]]
+):
+    """
+    Store memory dicts column by column: content as packed strings, each
+    RECORD_FIELDS entry as a typed column with a presence bitmask, and any
+    other keys as JSON in `state`.
+    """
+    pack_strings(arrays, prefix + "content", [record["content"] for record in records])
+    present = np.zeros(len(records), dtype=np.uint8)
+    for bit, (field, dtype) in enumerate(RECORD_FIELDS):
+        has = np.array([field in record for record in records], dtype=bool)
+        if has.all():
+            column = np.array([record[field] for record in records], dtype=dtype)
+        else:
+            column = np.array([record.get(field, 0) for record in records], dtype=dtype)
+        present[has] |= 1 << bit
+        arrays[prefix + field] = column
+    arrays[prefix + "present"] = present
+    known = {"content", *(field for field, _ in RECORD_FIELDS)}
+    extras = {}
+    for i, record in enumerate(records):
+        if record.keys() - known:
+            extras[str(i)] = {key: record[key] for key in record if key not in known}
+    if extras:
+        state[prefix + "extras"] = extras
+
+
+def write_snapshot(
+    path: str, kind: str, config: Dict[str, Any], state: Dict[str, Any], arrays: Dict[str, np.ndarray]
+) -> int:
+    """
+    Write a snapshot file and return its size in bytes. The file is
+    written next to `path` and renamed over it, so a crash mid-write never
+    leaves a truncated snapshot behind.
+    """
+    tmp_path = path + ".tmp"
+    specs = {}
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, 0, 0))
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            f.write(b"\0" * (-f.tell() % ALIGN))
+            specs[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": f.tell()}
+            f.write(array.tobytes())
+        header = json.dumps(
+            {"version": VERSION, "kind": kind, "config": config, "state": state, "arrays": specs}
+        ).encode("utf-8")
+        header_offset = f.tell()
+        f.write(header)
+        size = f.tell()
+        f.seek(0)
+        f.write(_PREAMBLE.pack(MAGIC, header_offset, len(header)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return size
+
+
+def _memory_classes() -> Dict[str, type]:
+    # Imported here: the memory modules import this one
+    from memory.embedding_similarity_memory import EmbeddingSimilarityMemory
+    from memory.fifo_memory import FIFOMemory
+    from memory.lru_memory import LRUMemory
+    from memory.utility_weighted_memory import UtilityWeightedMemory
+
+    return {
+        cls.__name__: cls
+        for cls in (FIFOMemory, LRUMemory, UtilityWeightedMemory, EmbeddingSimilarityMemory)
+    }
+
+
+def save_snapshot(memory, path: str) -> int:
+    """
+    Snapshot `memory` (FIFO, LRU, UWM or embedding memory) to `path` and
+    return the file size. Components passed to the constructor as objects
+    (admission filter, query cache, embedding cache, ANN index, model) are
+    not part of the snapshot; pass them again to load_snapshot().
+    """
+    config, state, arrays = memory._snapshot()
+    return write_snapshot(path, type(memory).__name__, config, state, arrays)
+
+
+def load_snapshot(path: str, **components):
+    """
+    Restore the memory saved at `path`. `components` are the constructor
+    keyword arguments that are not snapshotted (e.g. query_cache=,
+    admission=, cache=, ann=); derived structures such as the heap, trigram
+    index and ANN lists are rebuilt from the restored items.
+    """
+    snapshot = Snapshot(path)
+    classes = _memory_classes()
+    if snapshot.kind not in classes:
+        raise ValueError(f"unknown snapshot kind {snapshot.kind!r}")
+    return classes[snapshot.kind]._from_snapshot(snapshot, **components)
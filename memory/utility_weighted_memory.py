@@ -1,24 +1,136 @@
 # memory/utility_weighted_memory.py
 
+import heapq
 import math
+import random
 import time
-from typing import List, Dict, Any
+from operator import itemgetter
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+from memory.admission import TinyLFUAdmission
+from memory.multi_match import MultiMatcher
 from memory.base_memory import BaseMemory
+from memory.indexed_heap import IndexedMinHeap
+from memory.ngram_index import NgramIndex
+from memory.query_cache import QueryCache
+from memory.record_store import MemoryRecord, RecordStore
+from memory.shared_store import SharedRecordStore
+from memory.snapshot import Snapshot, pack_records, pack_strings
+from memory.wal import WriteAheadLog
 
 
 class UtilityWeightedMemory(BaseMemory):
+    """
+    Evicts the item with the lowest utility score.
+
+    eviction="scan" rescores every stored item on each insert (O(n)).
+    eviction="heap" keeps items in an indexed min-heap ordered by a
+    time-invariant key, so each eviction is O(log n) and picks the same
+    victim as the scan.
+    eviction="sampled" approximates the scan Redis-style: each eviction
+    scores `sample_size` random items plus a pool of the best losers from
+    earlier samples (`sample_pool`), so its cost is independent of
+    capacity. audit_eviction=True also runs the exact scan and counts how
+    often the sampled victim differs (reported in stats()).
+
+    backend="dict" keeps one dict per item. backend="columnar" keeps the
+    numeric fields in NumPy columns with interned content (RecordStore),
+    hands out dict-compatible MemoryRecord views, and runs scan eviction
+    and retrieval scoring as array operations. backend="shared" is the
+    columnar layout inside a multiprocessing.shared_memory segment
+    (SharedRecordStore): other processes query it read-only through
+    memory.shared_store.SharedMemoryReader(memory.shared_name) and send
+    their accesses back for apply_accesses(). Call close() to release it.
+
+    access_policy="all" credits every substring match with an access on
+    each retrieve (the original behaviour); access_policy="returned" only
+    credits the top_k items actually returned. Either way top_k is selected
+    with a bounded heap / partition rather than a full sort.
+
+    An optional TinyLFUAdmission filter drops inserts into a full memory
+    when the candidate (w_impact * impact + w_freq * its template's recent
+    accesses) is not worth more than the victim it would displace. The
+    victim lookup still runs, so this pays off most with heap or sampled
+    eviction.
+
+    An optional QueryCache remembers which items match each query and is
+    patched on every insert and eviction, so repeated queries skip the
+    substring scan; scoring and access updates still run on each call.
+
+    An optional WriteAheadLog records every insert, access and eviction;
+    replaying it restores items with their exact access_count and
+    last_access_time.
+    """
+
+    EVICTION_MODES = ("scan", "heap", "sampled")
+    BACKENDS = ("dict", "columnar", "shared")
+    ACCESS_POLICIES = ("all", "returned")
+
     def __init__(
         self,
         capacity: int,
         w_freq: float = 0.4,
         w_impact: float = 0.6,
         decay_lambda: float = 0.01,
+        eviction: str = "scan",
+        use_index: bool = False,
+        backend: str = "dict",
+        access_policy: str = "all",
+        low_watermark: Optional[int] = None,
+        sample_size: int = 5,
+        sample_pool: int = 16,
+        audit_eviction: bool = False,
+        seed: Optional[int] = 0,
+        admission: TinyLFUAdmission = None,
+        query_cache: QueryCache = None,
+        wal: WriteAheadLog = None,
     ):
-        super().__init__(capacity)
-        self.memories: List[Dict[str, Any]] = []
+        super().__init__(capacity, low_watermark)
+        if eviction not in self.EVICTION_MODES:
+            raise ValueError(f"eviction must be one of {self.EVICTION_MODES}, got {eviction!r}")
+        if backend not in self.BACKENDS:
+            raise ValueError(f"backend must be one of {self.BACKENDS}, got {backend!r}")
+        if access_policy not in self.ACCESS_POLICIES:
+            raise ValueError(f"access_policy must be one of {self.ACCESS_POLICIES}, got {access_policy!r}")
+        if sample_size < 1 or sample_pool < 0:
+            raise ValueError("sample_size must be >= 1 and sample_pool >= 0")
+        # item_id -> memory, in insertion order (ids are monotonic)
+        self.memories: Dict[int, Dict[str, Any]] = {}
         self.w_freq = w_freq
         self.w_impact = w_impact
         self.decay_lambda = decay_lambda
+        self.eviction = eviction
+        self.backend = backend
+        self.access_policy = access_policy
+        self._store = None
+        if backend == "columnar":
+            self._store = RecordStore(capacity)
+        elif backend == "shared":
+            self._store = SharedRecordStore(capacity, w_freq=w_freq, w_impact=w_impact, access_policy=access_policy)
+        self._next_id = 0
+        self._heap = IndexedMinHeap() if eviction == "heap" else None
+        self._index = NgramIndex() if use_index else None
+        # Sampled eviction: ids in a list for O(1) random picks (swap-remove),
+        # and the candidate pool carried between evictions.
+        self.sample_size = sample_size
+        self.sample_pool = sample_pool
+        self.audit_eviction = audit_eviction
+        self._rng = random.Random(seed)
+        self._ids: List[int] = []
+        self._id_pos: Dict[int, int] = {}
+        self._pool: List[int] = []
+        self._audited = 0
+        self._mismatches = 0
+        self.admission = admission
+        self.query_cache = query_cache
+        self.wal = wal
+        # While a list, every insert and eviction appends (WriteAheadLog.ADD
+        # or EVICT, item_id) to it; ConcurrentMemory drains it to update its
+        # read view incrementally
+        self._changes: Optional[List[Tuple[int, int]]] = None
+        # Latest last_access_time ever written; if scoring happens before it,
+        # age clamping breaks the time-invariant heap order.
+        self._max_access_time = -math.inf
 
     def _score(self, memory: Dict[str, Any], current_time: float) -> float:
         freq = memory.get("access_count", 0)
@@ -26,47 +138,621 @@ class UtilityWeightedMemory(BaseMemory):
         # Use the stored last_access_time
         last_access = memory.get("last_access_time", memory.get("timestamp", current_time))
         age = current_time - last_access
-        
+
         # Ensure age is never negative
         age = max(0, age)
-        
+
         decay = math.exp(-self.decay_lambda * age)
         return (self.w_freq * freq + self.w_impact * impact) * decay
 
+    def _heap_key(self, item_id: int, memory: Dict[str, Any]) -> Tuple[int, float, int]:
+        # score = base * exp(-lambda * (t - last_access)). The exp(-lambda * t)
+        # factor is shared by every item, so ordering by
+        # log(base) + lambda * last_access is the same at any t. Zero and
+        # negative bases get their own tiers; item_id breaks ties the way the
+        # scan does (first inserted wins).
+        return self._key(item_id, memory.get("access_count", 0), memory.get("impact", 0), memory["last_access_time"])
+
+    def _key(self, item_id: int, access_count: int, impact: float, last_access: float) -> Tuple[int, float, int]:
+        base = self.w_freq * access_count + self.w_impact * impact
+        if base > 0:
+            return (1, math.log(base) + self.decay_lambda * last_access, item_id)
+        if base < 0:
+            return (-1, -(math.log(-base) + self.decay_lambda * last_access), item_id)
+        return (0, 0.0, item_id)
+
+    def _eviction_key(self, item_id: int, memory: Dict[str, Any], current_time: float) -> Tuple[int, float, int]:
+        # _heap_key with the age clamped at current_time, as _score clamps
+        # it. Eviction compares these instead of _score, which underflows to
+        # 0 for every old item and would leave the choice to insertion order.
+        base = self.w_freq * memory.get("access_count", 0) + self.w_impact * memory.get("impact", 0)
+        if base == 0:
+            return (0, 0.0, item_id)
+        last_access = memory.get("last_access_time", memory.get("timestamp", current_time))
+        if last_access > current_time:
+            last_access = current_time
+        if base > 0:
+            return (1, math.log(base) + self.decay_lambda * last_access, item_id)
+        return (-1, -(math.log(-base) + self.decay_lambda * last_access), item_id)
+
+    def _select_victim(self, current_time: float) -> int:
+        if self._heap is not None and current_time >= self._max_access_time:
+            return self._heap.peek()[0]
+        if self.eviction == "sampled":
+            return self._sampled_victims(current_time, 1)[0]
+        return self._scan_victim(current_time)
+
+    def _scan_victim(self, current_time: float) -> int:
+        if self._store is not None:
+            store = self._store
+            tier, value = store.eviction_keys(current_time, self.w_freq, self.w_impact, self.decay_lambda)
+            lowest = tier == tier.min()
+            value = np.where(lowest, value, np.inf)
+            tied = np.flatnonzero(lowest & (value == value.min()))
+            return int(store.item_id[tied].min())
+        # Linear scan: lowest key; item_id breaks ties (first inserted wins)
+        key = self._eviction_key
+        return min(key(item_id, m, current_time) for item_id, m in self.memories.items())[2]
+
+    def _select_victims(self, current_time: float, count: int) -> List[int]:
+        """The `count` lowest-utility items, lowest first, in one selection."""
+        if count == 1:
+            return [self._select_victim(current_time)]
+        if self._heap is not None and current_time >= self._max_access_time:
+            return [item_id for item_id, _ in self._heap.nsmallest(count)]
+        if self.eviction == "sampled":
+            return self._sampled_victims(current_time, count)
+        return self._scan_victims(current_time, count)
+
+    def _scan_victims(self, current_time: float, count: int) -> List[int]:
+        if count == 1:
+            return [self._scan_victim(current_time)]
+        if self._store is not None:
+            store = self._store
+            tier, value = store.eviction_keys(current_time, self.w_freq, self.w_impact, self.decay_lambda)
+            order = np.lexsort((store.item_id, value, tier))[:min(count, len(self.memories))]
+            return store.item_id[order].tolist()
+        keys = (self._eviction_key(item_id, m, current_time) for item_id, m in self.memories.items())
+        return [key[2] for key in heapq.nsmallest(count, keys)]
+
+    def _sampled_victims(self, current_time: float, count: int) -> List[int]:
+        """
+        Lowest-scoring `count` items among a random sample and the pool of
+        earlier near-losers. Pool entries are rescored, since accesses and
+        decay move them; evicted ones are dropped.
+        """
+        ids, memories = self._ids, self.memories
+        if len(ids) <= self.sample_size + count:
+            candidates = set(ids)
+        else:
+            # Distinct ids, so there are always sample_size more candidates
+            # than victims to choose between
+            candidates = set(self._rng.sample(ids, count + self.sample_size))
+            candidates.update(i for i in self._pool if i in memories)
+        ranked = sorted(self._eviction_key(i, memories[i], current_time) for i in candidates)
+        victims = [key[2] for key in ranked[:count]]
+        self._pool = [key[2] for key in ranked[count:count + self.sample_pool]]
+        if self.audit_eviction:
+            # A different victim with the same score as the exact one is a
+            # tie, not a mismatch
+            self._audited += 1
+            exact = self._scan_victims(current_time, count)
+            if [key[:2] for key in ranked[:count]] != sorted(
+                self._eviction_key(i, memories[i], current_time)[:2] for i in exact
+            ):
+                self._mismatches += 1
+        return victims
+
+    def _admit(self, memory: Dict[str, Any], victim_id: int, current_time: float) -> bool:
+        admission = self.admission
+        candidate = self.w_impact * memory.get("impact", 0) + self.w_freq * admission.frequency(memory["content"])
+        victim = self._score(self.memories[victim_id], current_time)
+        return admission.admit(candidate, victim)
+
+    def _evict(self, item_id: int):
+        if self.wal is not None:
+            self.wal.log_evict(item_id)
+        memory = self.memories.pop(item_id)
+        if self._changes is not None:
+            self._changes.append((WriteAheadLog.EVICT, item_id))
+        if self._store is not None:
+            self._store.remove(memory.slot)
+        if self._heap is not None:
+            self._heap.remove(item_id)
+        if self._index is not None:
+            self._index.remove(item_id)
+        if self.query_cache is not None:
+            self.query_cache.removed(item_id)
+        if self.eviction == "sampled":
+            # Swap-remove from the id list
+            pos = self._id_pos.pop(item_id)
+            last = self._ids.pop()
+            if last != item_id:
+                self._ids[pos] = last
+                self._id_pos[last] = pos
+
     def add(self, memory: Dict[str, Any]):
         memory["access_count"] = 0
         # Use the timestamp from the memory item as the initial access time
         memory["last_access_time"] = memory.get("timestamp", time.time())
-        
-        if len(self.memories) >= self.capacity:
+
+        if len(self.memories) >= self.capacity and self.memories:
+            started = time.perf_counter()
             # Use the new memory's timestamp as the "current_time" for scoring
             current_time = memory.get("timestamp", time.time())
-            scores = [self._score(m, current_time) for m in self.memories]
-            min_idx = scores.index(min(scores))
-            self.memories.pop(min_idx)
-        self.memories.append(memory)
+            count = min(self._overflow(len(self.memories) + 1), len(self.memories))
+            victims = self._select_victims(current_time, count)
+            if self.admission is not None and not self._admit(memory, victims[0], current_time):
+                return
+            for victim_id in victims:
+                self._evict(victim_id)
+            self._record_eviction(len(victims), started)
+        self._inserts += 1
+
+        item_id = self._next_id
+        self._next_id += 1
+        self._insert(item_id, memory)
+
+    def _insert(self, item_id: int, memory: Dict[str, Any]):
+        if self.wal is not None:
+            self.wal.log_add(item_id, memory)
+        if self._store is not None:
+            memory = self._store.insert(item_id, memory)
+        self.memories[item_id] = memory
+        if self._changes is not None:
+            self._changes.append((WriteAheadLog.ADD, item_id))
+        self._max_access_time = max(self._max_access_time, memory["last_access_time"])
+        if self._heap is not None:
+            self._heap.push(item_id, self._heap_key(item_id, memory))
+        if self._index is not None:
+            self._index.add(item_id, memory["content"])
+        if self.query_cache is not None:
+            self.query_cache.added(item_id, memory["content"].lower())
+        if self.eviction == "sampled":
+            self._id_pos[item_id] = len(self._ids)
+            self._ids.append(item_id)
+
+    def add_many(self, memories: List[Dict[str, Any]]):
+        """
+        Add a batch with the same final state as calling add() per item.
+
+        Each sequential eviction removes the pool minimum, so the existing
+        items that get evicted are always the smallest len(batch) of them by
+        heap key. Those few candidates are picked in one selection and the
+        batch is replayed against them on a small heap, instead of scanning
+        the whole memory once per item. Falls back to add() per item when
+        the time-invariant key does not apply (see _heap_key).
+        """
+        memories = list(memories)
+        if not memories:
+            return
+        now = time.time()
+        for memory in memories:
+            memory["access_count"] = 0
+            memory["last_access_time"] = memory.get("timestamp", now)
+
+        times = [memory["last_access_time"] for memory in memories]
+        in_order = all(a <= b for a, b in zip(times, times[1:]))
+        if (
+            self.eviction != "scan"
+            or self.admission is not None
+            or self.low_watermark != self.capacity
+            or not in_order
+            or times[0] < self._max_access_time
+        ):
+            # Heap and sampled eviction are already cheap per add
+            for memory in memories:
+                self.add(memory)
+            return
+
+        started = time.perf_counter()
+        first_id = self._next_id
+        pool = self._smallest_keys(min(len(memories), len(self.memories)))
+        heapq.heapify(pool)
+        size = len(self.memories)
+        victims = set()
+        for offset, memory in enumerate(memories):
+            if size >= self.capacity and size > 0:
+                victims.add(heapq.heappop(pool)[2])
+                size -= 1
+            heapq.heappush(pool, self._heap_key(first_id + offset, memory))
+            size += 1
+
+        for item_id in sorted(v for v in victims if v < first_id):
+            self._evict(item_id)
+        for offset, memory in enumerate(memories):
+            item_id = first_id + offset
+            if item_id not in victims:
+                self._insert(item_id, memory)
+        self._next_id = first_id + len(memories)
+        self._inserts += len(memories)
+        if victims:
+            self._record_eviction(len(victims), started)
+
+    def _smallest_keys(self, n: int) -> List[Tuple[int, float, int]]:
+        """Heap keys of the n stored items that would be evicted first."""
+        if n <= 0:
+            return []
+        if self._store is None:
+            return heapq.nsmallest(n, (self._heap_key(i, m) for i, m in self.memories.items()))
+
+        store = self._store
+        # No age clamping: the caller only gets here at or after every last access
+        tier, value = store.eviction_keys(math.inf, self.w_freq, self.w_impact, self.decay_lambda)
+        order = np.lexsort((store.item_id, value, tier))[:n]
+        # Recompute with math.log so keys compare exactly with _heap_key's
+        memories = self.memories
+        return [self._heap_key(item_id, memories[item_id]) for item_id in store.item_id[order].tolist()]
+
+    def _match_ids(self, query: str):
+        """Ids whose content contains `query`, as a set (index / cache) or None."""
+        if self.query_cache is None:
+            return self._index.search(query) if self._index is not None else None
+        q = query.lower()
+        ids = self.query_cache.get(q)
+        if ids is None:
+            if self._index is not None:
+                ids = self._index.search(query)
+            else:
+                ids = {i for i, m in self.memories.items() if q in m["content"].lower()}
+            self.query_cache.put(q, ids)
+        return ids
+
+    def _matches(self, query: str):
+        ids = self._match_ids(query)
+        if ids is not None:
+            memories = self.memories
+            return ((i, memories[i]) for i in sorted(ids))
+        q = query.lower()
+        return ((i, m) for i, m in self.memories.items() if q in m["content"].lower())
+
+    def _touch(self, item_id: int, memory: Dict[str, Any], current_time: float):
+        if self.wal is not None:
+            self.wal.log_access(item_id, current_time)
+        memory["access_count"] = memory.get("access_count", 0) + 1
+        memory["last_access_time"] = current_time
+        if self._heap is not None:
+            self._heap.update(item_id, self._heap_key(item_id, memory))
+        if self.admission is not None:
+            self.admission.record(memory["content"])
+
+    def _touch_many(self, item_ids: List[int], counts: List[int], times: List[float]):
+        """
+        Credit item_ids[i] with counts[i] accesses, the latest at times[i]:
+        a batch of touches coalesced per item, with one heap update each.
+        """
+        if not item_ids:
+            return
+        wal, heap, admission, memories = self.wal, self._heap, self.admission, self.memories
+        if self._store is not None:
+            store = self._store
+            slots = np.array([memories[i].slot for i in item_ids], dtype=np.intp)
+            store.access_count[slots] += np.asarray(counts, dtype=np.int64)
+            store.last_access_time[slots] = times
+        for item_id, count, current_time in zip(item_ids, counts, times):
+            memory = memories[item_id]
+            if self._store is None:
+                memory["access_count"] = memory.get("access_count", 0) + count
+                memory["last_access_time"] = current_time
+            if wal is not None:
+                for _ in range(count):
+                    wal.log_access(item_id, current_time)
+            if heap is not None:
+                heap.update(item_id, self._heap_key(item_id, memory))
+            if admission is not None:
+                admission.record(memory["content"], count)
+        self._max_access_time = max(self._max_access_time, max(times))
+
+    def apply_accesses(self, batches: List[Tuple[List[int], float]]) -> int:
+        """
+        Credit deferred accesses, e.g. from ConcurrentMemory readers or
+        SharedMemoryReader processes: each batch is (item ids, time). Repeat
+        accesses to an item are coalesced into one update (count, latest
+        time); items evicted since the read are skipped. Returns the number
+        of accesses applied.
+        """
+        return self._apply_coalesced(*self._coalesce_accesses(batches))
+
+    @staticmethod
+    def _coalesce_accesses(batches: List[Tuple[List[int], float]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(item ids ascending, access counts, latest access times) for `batches`."""
+        batches = [(np.asarray(ids, dtype=np.int64), t) for ids, t in batches]
+        if not batches:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        ids = np.concatenate([ids for ids, _ in batches])
+        times = np.concatenate([np.full(len(ids), t, dtype=np.float64) for ids, t in batches])
+        order = np.lexsort((times, ids))
+        ids, times = ids[order], times[order]
+        unique, first, counts = np.unique(ids, return_index=True, return_counts=True)
+        return unique, counts, times[first + counts - 1]
+
+    def _apply_coalesced(self, ids: np.ndarray, counts: np.ndarray, latest: np.ndarray) -> int:
+        memories = self.memories
+        live = [i for i, item_id in enumerate(ids.tolist()) if item_id in memories]
+        self._touch_many(ids[live].tolist(), counts[live].tolist(), latest[live].tolist())
+        return int(counts[live].sum())
+
+    @property
+    def shared_name(self) -> Optional[str]:
+        """Segment name for SharedMemoryReader (backend="shared"), else None."""
+        return self._store.name if self.backend == "shared" else None
+
+    def close(self):
+        """Release the shared segment (backend="shared"); no-op otherwise."""
+        if self.backend == "shared" and self._store is not None:
+            self._store.close()
+            self._store = None
+
+    @staticmethod
+    def _top_k(candidates: List[Tuple[float, int, Dict[str, Any]]], top_k: int):
+        # heapq.nlargest is documented as sorted(..., reverse=True)[:n],
+        # ties included, but only costs O(m log k)
+        if 0 <= top_k < len(candidates):
+            return heapq.nlargest(top_k, candidates, key=itemgetter(0))
+        candidates.sort(key=itemgetter(0), reverse=True)
+        return candidates[:top_k]
 
     def retrieve(self, query: str, top_k: int = 1, current_time: float = None) -> List[Dict[str, Any]]:
         if current_time is None:
             current_time = time.time()
-            
-        candidates = []
-        for m in self.memories:
-            if query.lower() in m["content"].lower():
-                m["access_count"] = m.get("access_count", 0) + 1
-                m["last_access_time"] = current_time
+        if self._store is not None:
+            return self._retrieve_columnar(query, top_k, current_time)
+        return self._rank(self._matches(query), top_k, current_time)
+
+    def retrieve_many(
+        self, queries: List[str], top_k: int = 1, current_time: float = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        retrieve() for each query in order, with every query matched in a
+        single pass over the stored content. Ranking and access updates
+        then run query by query, so results equal sequential calls.
+        """
+        if current_time is None:
+            current_time = time.time()
+        if self._index is not None or self.query_cache is not None or len(queries) < 2:
+            # Index / cache lookups are already sublinear per query
+            return [self.retrieve(query, top_k, current_time) for query in queries]
+
+        lowered = [query.lower() for query in queries]
+        patterns = list(dict.fromkeys(lowered))
+        position = {pattern: i for i, pattern in enumerate(patterns)}
+        matcher = MultiMatcher(patterns)
+        if self._store is not None:
+            per_pattern = self._store.match_slots_many(matcher)
+            return [self._rank_slots(per_pattern[position[q]], top_k, current_time) for q in lowered]
+
+        per_pattern = matcher.match(list(self.memories), [m["content"].lower() for m in self.memories.values()])
+        memories = self.memories
+        return [
+            self._rank(((i, memories[i]) for i in per_pattern[position[q]]), top_k, current_time)
+            for q in lowered
+        ]
+
+    def _rank(self, matches, top_k: int, current_time: float) -> List[Dict[str, Any]]:
+        """Score (item_id, memory) matches, apply access updates, return the top_k."""
+        if self.access_policy == "all":
+            candidates = []
+            for item_id, m in matches:
+                self._touch(item_id, m, current_time)
                 # Calculate score dynamically for sorting
                 score = self._score(m, current_time)
-                candidates.append((score, m))
-        
-        # Sort by score descending (Highest Utility First)
-        candidates.sort(key=lambda x: x[0], reverse=True)
-        return [c[1] for c in candidates][:top_k]
+                candidates.append((score, item_id, m))
+            touched = candidates
+            top = self._top_k(candidates, top_k)
+        else:
+            # Score each match as it will be once accessed (count + 1, age 0)
+            # and only write to the items that are returned
+            candidates = [
+                (self.w_freq * (m.get("access_count", 0) + 1) + self.w_impact * m.get("impact", 0), item_id, m)
+                for item_id, m in matches
+            ]
+            top = touched = self._top_k(candidates, top_k)
+            for _, item_id, m in top:
+                self._touch(item_id, m, current_time)
+        if touched:
+            self._max_access_time = max(self._max_access_time, current_time)
+
+        # Highest utility first
+        return [c[2] for c in top]
+
+    def _retrieve_columnar(self, query: str, top_k: int, current_time: float) -> List[Dict[str, Any]]:
+        store = self._store
+        ids = self._match_ids(query)
+        if ids is not None:
+            slots = np.array([self.memories[i].slot for i in sorted(ids)], dtype=np.intp)
+        else:
+            slots = store.match_slots(query.lower())
+        return self._rank_slots(slots, top_k, current_time)
+
+    def _rank_slots(self, slots: np.ndarray, top_k: int, current_time: float) -> List[Dict[str, Any]]:
+        store = self._store
+        if len(slots) == 0:
+            return []
+
+        if self.access_policy == "all":
+            self._touch_slots(slots, current_time)
+            age = np.maximum(current_time - store.last_access_time[slots], 0.0)
+            scores = (self.w_freq * store.access_count[slots] + self.w_impact * store.impact[slots]) * np.exp(
+                -self.decay_lambda * age
+            )
+        else:
+            scores = self.w_freq * (store.access_count[slots] + 1) + self.w_impact * store.impact[slots]
+
+        # Highest utility first; ties in insertion order like list.sort
+        ids = store.item_id[slots]
+        n = len(slots)
+        if 0 <= top_k < n:
+            if top_k == 0:
+                return []
+            kth = scores[np.argpartition(-scores, top_k - 1)[top_k - 1]]
+            keep = np.flatnonzero(scores >= kth)
+        else:
+            keep = np.arange(n)
+        order = keep[np.lexsort((ids[keep], -scores[keep]))][:top_k]
+
+        if self.access_policy == "returned":
+            self._touch_slots(slots[order], current_time)
+        return [self.memories[int(item_id)] for item_id in ids[order]]
+
+    def _touch_slots(self, slots: np.ndarray, current_time: float):
+        store = self._store
+        store.access_count[slots] += 1
+        store.last_access_time[slots] = current_time
+        if len(slots):
+            self._max_access_time = max(self._max_access_time, current_time)
+        if self._heap is not None:
+            for item_id in store.item_id[slots].tolist():
+                self._heap.update(item_id, self._heap_key(item_id, self.memories[item_id]))
+        if self.admission is not None:
+            for slot in slots.tolist():
+                self.admission.record(store.content(slot))
+        if self.wal is not None:
+            for item_id in store.item_id[slots].tolist():
+                self.wal.log_access(item_id, current_time)
+
+    def _replay(self, op: int, key: Any, time: float, memory: Optional[Dict[str, Any]]):
+        if op == WriteAheadLog.ADD:
+            self._insert(key, memory)
+            self._next_id = max(self._next_id, key + 1)
+            self._inserts += 1
+        elif op == WriteAheadLog.ACCESS:
+            self._touch(key, self.memories[key], time)
+            self._max_access_time = max(self._max_access_time, time)
+        else:
+            self._evict(key)
+            self._evicted += 1
+
+    def _snapshot(self):
+        config = {
+            "capacity": self.capacity,
+            "w_freq": self.w_freq,
+            "w_impact": self.w_impact,
+            "decay_lambda": self.decay_lambda,
+            "eviction": self.eviction,
+            "use_index": self._index is not None,
+            "backend": self.backend,
+            "access_policy": self.access_policy,
+            "low_watermark": self.low_watermark,
+            "sample_size": self.sample_size,
+            "sample_pool": self.sample_pool,
+            "audit_eviction": self.audit_eviction,
+        }
+        version, internal, gauss = self._rng.getstate()
+        state = dict(
+            self._cost_state(),
+            next_id=self._next_id,
+            max_access_time=self._max_access_time,
+            rng=[version, list(internal), gauss],
+            pool=self._pool,
+            audited=self._audited,
+            mismatches=self._mismatches,
+        )
+        arrays = {"sample_ids": np.array(self._ids, dtype=np.int64)}
+        if self._store is None:
+            arrays["item_id"] = np.fromiter(self.memories, dtype=np.int64, count=len(self.memories))
+            pack_records(arrays, state, "items.", list(self.memories.values()))
+            return config, state, arrays
+
+        # Columnar: the store's columns and content table as they are, so a
+        # restore can map them back without rebuilding any record
+        store = self._store
+        for name in RecordStore.FLOAT_FIELDS + RecordStore.INT_FIELDS + ("content_id", "item_id"):
+            arrays["store." + name] = getattr(store, name)
+        pack_strings(arrays, "store.contents", [c if c is not None else "" for c in store._contents])
+        state["store.extras"] = {str(slot): extras for slot, extras in store._extras.items()}
+        return config, state, arrays
+
+    @classmethod
+    def _from_snapshot(
+        cls, snapshot: Snapshot, admission: TinyLFUAdmission = None, query_cache: QueryCache = None
+    ) -> "UtilityWeightedMemory":
+        memory = cls(**snapshot.config, admission=admission, query_cache=query_cache)
+        state = snapshot.state
+        memory._restore_cost_state(state)
+        memory._next_id = state["next_id"]
+        memory._max_access_time = state["max_access_time"]
+        version, internal, gauss = state["rng"]
+        memory._rng.setstate((version, tuple(internal), gauss))
+        memory._pool = state["pool"]
+        memory._audited = state["audited"]
+        memory._mismatches = state["mismatches"]
+        if query_cache is not None:
+            query_cache.clear()
+
+        if memory._store is None:
+            ids = snapshot.array("item_id").tolist()
+            memory.memories = dict(zip(ids, snapshot.records("items.")))
+        else:
+            memory._restore_store(snapshot)
+
+        memories = memory.memories
+        if memory._heap is not None:
+            if memory._store is None:
+                keys = [(i, memory._heap_key(i, m)) for i, m in memories.items()]
+            else:
+                store, key = memory._store, memory._key
+                slots = np.array([m.slot for m in memories.values()], dtype=np.intp)
+                columns = zip(
+                    memories,
+                    store.access_count[slots].tolist(),
+                    store.impact[slots].tolist(),
+                    store.last_access_time[slots].tolist(),
+                )
+                keys = [(i, key(i, count, impact, last)) for i, count, impact, last in columns]
+            memory._heap.build(keys)
+        if memory._index is not None:
+            for item_id, m in memories.items():
+                memory._index.add(item_id, m["content"])
+        if memory.eviction == "sampled":
+            memory._ids = snapshot.array("sample_ids").tolist()
+            memory._id_pos = {item_id: pos for pos, item_id in enumerate(memory._ids)}
+        return memory
+
+    def _restore_store(self, snapshot: Snapshot):
+        """Load the snapshot's columns into the store (mapped as-is unless shared)."""
+        store = self._store
+        store.restore(
+            {
+                name: snapshot.array("store." + name)
+                for name in RecordStore.FLOAT_FIELDS + RecordStore.INT_FIELDS + ("content_id", "item_id")
+            },
+            snapshot.strings("store.contents"),
+            {int(slot): extras for slot, extras in snapshot.state["store.extras"].items()},
+        )
+
+        occupied = np.flatnonzero(store.item_id >= 0)
+        occupied = occupied[np.argsort(store.item_id[occupied])]
+        self.memories = {
+            item_id: MemoryRecord(store, slot, item_id)
+            for slot, item_id in zip(occupied.tolist(), store.item_id[occupied].tolist())
+        }
 
     def stats(self) -> Dict[str, Any]:
-        return {
+        stats = {
             "size": len(self.memories),
             "capacity": self.capacity,
             "w_freq": self.w_freq,
-            "w_impact": self.w_impact
+            "w_impact": self.w_impact,
+            "eviction": self.eviction,
+            "backend": self.backend,
+            "access_policy": self.access_policy,
+            "low_watermark": self.low_watermark,
+            "eviction_cost": self.eviction_cost(),
         }
+        if self._store is not None:
+            stats["column_bytes"] = self._store.nbytes()
+        if self.backend == "shared":
+            stats["shared"] = self._store.stats()
+        if self.admission is not None:
+            stats["admission"] = self.admission.stats()
+        if self.query_cache is not None:
+            stats["query_cache"] = self.query_cache.stats()
+        if self.eviction == "sampled":
+            stats["sampling"] = {
+                "sample_size": self.sample_size,
+                "sample_pool": self.sample_pool,
+                "audited": self._audited,
+                "mismatches": self._mismatches,
+                "mismatch_rate": self._mismatches / self._audited if self._audited else 0.0,
+            }
+        return stats
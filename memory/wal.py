@@ -0,0 +1,291 @@
+# memory/wal.py
+
+import copy
+import json
+import os
+import struct
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from memory.base_memory import BaseMemory
+from memory.snapshot import Snapshot, load_snapshot, write_snapshot
+
+
+class WriteAheadLog:
+    """
+    Append-only log of the add, access and evict events of a memory.
+
+    Every event is one frame: a fixed 33-byte header (payload length,
+    CRC32, sequence number, opcode, item key, time) followed by a payload
+    that only adds carry (the item as JSON) and string keys use (LRU keys
+    are the content). Frames are buffered and written with a single
+    fsync per `group_commit` events, or on commit(); a crash loses at most
+    the uncommitted tail, and a torn final frame is cut off on open.
+
+    replay() feeds the events back into a memory, which re-applies them
+    directly (insert, touch, evict) without re-running eviction or
+    retrieval, so item contents, access_count and last_access_time come
+    back exactly. compact() folds the log into a snapshot: the active log
+    is rotated out, the memory is captured in the foreground, and the
+    snapshot is written in a background thread before the old log is
+    deleted. The snapshot records the last sequence number it covers, so
+    recover() skips events it already contains.
+
+    With `compact_every` set, maybe_compact() starts a background
+    compaction of the attached memory once that many events have been
+    logged since the last one. Call it between memory operations (e.g.
+    after each observation), never from inside one.
+
+    Sampled eviction's random state is not logged, so a replayed memory
+    has the same items but may draw different samples afterwards.
+
+    Args:
+        path: Log file; the log being compacted lives at path + ".compacting"
+        group_commit: Events buffered per write + fsync
+        fsync: False skips fsync (durable against process crashes only)
+        compact_every: Events between automatic compactions (None = manual)
+    """
+
+    ADD, ACCESS, EVICT = 1, 2, 3
+    # The key is in the payload (UTF-8) instead of the int64 field
+    STRING_KEY = 0x80
+    _FRAME = struct.Struct("<IIQBqd")  # payload length, crc32, lsn, op, key, time
+
+    def __init__(
+        self, path: str, group_commit: int = 64, fsync: bool = True, compact_every: Optional[int] = None
+    ):
+        if group_commit < 1:
+            raise ValueError("group_commit must be >= 1")
+        if compact_every is not None and compact_every < 1:
+            raise ValueError("compact_every must be >= 1")
+        self.path = path
+        self.group_commit = group_commit
+        self.fsync = fsync
+        self.compact_every = compact_every
+        self.lsn = 0
+        for log_path in (self.compacting_path, path):
+            if os.path.exists(log_path):
+                # Finds the last sequence number and truncates a torn tail
+                with open(log_path, "rb") as f:
+                    self._frames(log_path, memoryview(f.read()))
+        self._file = open(path, "ab")
+        self._buffer = []
+        self._compaction: Optional[threading.Thread] = None
+        self.events = 0
+        self.commits = 0
+        self.bytes_written = 0
+        self.compactions = 0
+        self._memory = None
+        self._snapshot_path: Optional[str] = None
+        self._compacted_lsn = self.lsn
+
+    @property
+    def compacting_path(self) -> str:
+        return self.path + ".compacting"
+
+    def log_add(self, key: Any, memory: Dict[str, Any]):
+        self._append(self.ADD, key, 0.0, json.dumps(dict(memory)).encode("utf-8"))
+
+    def log_access(self, key: Any, time: float):
+        self._append(self.ACCESS, key, time)
+
+    def log_evict(self, key: Any):
+        self._append(self.EVICT, key, 0.0)
+
+    def _append(self, op: int, key: Any, time: float, payload: bytes = b""):
+        if isinstance(key, str):
+            if op == self.ADD:
+                key = -1  # the key is the content inside the payload
+            else:
+                op |= self.STRING_KEY
+                payload = key.encode("utf-8")
+                key = -1
+        self.lsn += 1
+        header = self._FRAME.pack(len(payload), 0, self.lsn, op, key, time)
+        crc = zlib.crc32(payload, zlib.crc32(header[8:]))
+        self._buffer.append(header[:4] + crc.to_bytes(4, "little") + header[8:] + payload)
+        self.events += 1
+        if len(self._buffer) >= self.group_commit:
+            self.commit()
+
+    def commit(self):
+        """Write buffered events and fsync them (one group commit)."""
+        if not self._buffer:
+            return
+        data = b"".join(self._buffer)
+        self._buffer = []
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.commits += 1
+        self.bytes_written += len(data)
+
+    def close(self):
+        self.commit()
+        self.wait()
+        self._file.close()
+
+    def records(self, after_lsn: int = 0) -> Iterator[Tuple[int, int, Any, float, Optional[Dict[str, Any]]]]:
+        """
+        (lsn, op, key, time, memory) for every committed event with a
+        sequence number above `after_lsn`, oldest first. `memory` is the
+        added item for ADD events and None otherwise.
+        """
+        unpack, size = self._FRAME.unpack_from, self._FRAME.size
+        for path in (self.compacting_path, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            view = memoryview(data)
+            for pos in self._frames(path, view):
+                length, _, lsn, op, key, time = unpack(view, pos)
+                if lsn <= after_lsn:
+                    continue
+                memory = None
+                if op & self.STRING_KEY:
+                    op &= ~self.STRING_KEY
+                    key = str(view[pos + size:pos + size + length], "utf-8")
+                elif op == self.ADD:
+                    memory = json.loads(view[pos + size:pos + size + length].tobytes())
+                yield lsn, op, key, time, memory
+
+    def _frames(self, path: str, view: memoryview) -> List[int]:
+        """
+        Offsets of the intact frames in `view`, read from `path`; also
+        advances self.lsn. A torn or corrupt tail of the active log (a
+        crash mid-write) is cut off.
+        """
+        unpack, size, crc32 = self._FRAME.unpack_from, self._FRAME.size, zlib.crc32
+        offsets = []
+        pos, total = 0, len(view)
+        while pos + size <= total:
+            length, crc = unpack(view, pos)[:2]
+            end = pos + size + length
+            if end > total or crc32(view[pos + 8:end]) != crc:
+                break
+            offsets.append(pos)
+            pos = end
+        if offsets:
+            self.lsn = max(self.lsn, unpack(view, offsets[-1])[2])
+        if pos < total and path == self.path:
+            with open(path, "r+b") as f:
+                f.truncate(pos)
+        return offsets
+
+    def replay(self, memory, after_lsn: int = 0) -> int:
+        """Re-apply the logged events to `memory`; returns how many were applied."""
+        wal, memory.wal = memory.wal, None  # replayed events are already logged
+        count = 0
+        try:
+            for _, op, key, time, item in self.records(after_lsn):
+                memory._replay(op, key, time, item)
+                count += 1
+        finally:
+            memory.wal = wal
+        return count
+
+    def recover(self, snapshot_path: str, make_memory: Callable[[], Any], **components):
+        """
+        Restore a memory after a restart: load the snapshot at
+        `snapshot_path` (or call make_memory() when there is none), replay
+        the events it does not cover, and attach this log to it.
+        `components` are passed to load_snapshot().
+        """
+        if os.path.exists(snapshot_path):
+            memory = load_snapshot(snapshot_path, **components)
+            after_lsn = Snapshot(snapshot_path).state.get("wal_lsn", 0)
+        else:
+            memory = make_memory()
+            after_lsn = 0
+        self.replay(memory, after_lsn)
+        self._compacted_lsn = after_lsn
+        self.attach(memory, snapshot_path)
+        return memory
+
+    def attach(self, memory, snapshot_path: Optional[str] = None):
+        """Log `memory`'s events from now on; maybe_compact() snapshots to `snapshot_path`."""
+        if type(memory)._replay is BaseMemory._replay:
+            # It would never log, and recover() would silently lose events
+            raise NotImplementedError(f"{type(memory).__name__} does not support write-ahead logging")
+        memory.wal = self
+        self._memory = memory
+        self._snapshot_path = snapshot_path
+
+    def maybe_compact(self) -> bool:
+        """Start a background compaction if compact_every events have piled up."""
+        if (
+            self.compact_every is None
+            or self._snapshot_path is None
+            or self.lsn - self._compacted_lsn < self.compact_every
+            or (self._compaction is not None and self._compaction.is_alive())
+        ):
+            return False
+        self.compact(self._memory, self._snapshot_path)
+        return True
+
+    def compact(self, memory, snapshot_path: str, background: bool = True):
+        """
+        Fold everything logged so far into a snapshot of `memory` at
+        `snapshot_path`. The memory is captured now; with background=True
+        the snapshot file is written by a thread while new events go to a
+        fresh log. Only one compaction runs at a time.
+        """
+        self.wait()
+        self.commit()
+        config, state, arrays = memory._snapshot()
+        state = copy.deepcopy(state)
+        state["wal_lsn"] = self._compacted_lsn = self.lsn
+        if background:
+            # Arrays may be live columns of the memory; the thread needs a frozen copy
+            arrays = {name: np.array(array) for name, array in arrays.items()}
+        kind = type(memory).__name__
+
+        self._file.close()
+        if os.path.exists(self.compacting_path):
+            # Left over from a compaction that crashed; the old snapshot
+            # does not cover it, so keep it until the new one is written
+            with open(self.path, "rb") as src, open(self.compacting_path, "ab") as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.compacting_path)
+        self._file = open(self.path, "ab")
+
+        def fold():
+            write_snapshot(snapshot_path, kind, config, state, arrays)
+            os.remove(self.compacting_path)
+            self.compactions += 1
+
+        if not background:
+            fold()
+            return
+        self._compaction = threading.Thread(target=fold, name="wal-compaction", daemon=True)
+        self._compaction.start()
+
+    def wait(self):
+        """Block until a running background compaction has finished."""
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+    def size(self) -> int:
+        """Committed bytes still to be replayed (active + compacting log)."""
+        return sum(os.path.getsize(p) for p in (self.path, self.compacting_path) if os.path.exists(p))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lsn": self.lsn,
+            "events": self.events,
+            "commits": self.commits,
+            "events_per_commit": self.events / self.commits if self.commits else 0.0,
+            "bytes_written": self.bytes_written,
+            "log_bytes": self.size(),
+            "compactions": self.compactions,
+        }
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from memory.utility_weighted_memory import UtilityWeightedMemory
+
+START = 1.7e9  # wall-clock timestamps, as SimpleAgent uses by default
+GAPS = [0.0, 1.0, 5.0, 3600.0, 86400.0, 1e6]  # exp(-0.01 * age) underflows past ~7e4 s
+
+
+def random_ops(seed, count=400):
+    rng = random.Random(seed)
+    ops, now = [], START
+    for i in range(count):
+        now += rng.choice(GAPS)
+        if rng.random() < 0.25:
+            ops.append(("retrieve", f"w{rng.randrange(8)}", now))
+        else:
+            item = {"content": f"item {i} w{rng.randrange(8)}", "timestamp": now,
+                    "impact": rng.choice([0.0, 0.1, 0.5, 1.0, rng.random()])}
+            ops.append(("add", item, now))
+    return ops
+
+
+def run(memory, ops):
+    results = []
+    for op, arg, now in ops:
+        if op == "add":
+            memory.add(dict(arg))
+        else:
+            results.append([m["content"] for m in memory.retrieve(arg, top_k=2, current_time=now)])
+    return results, [m["content"] for m in memory.memories.values()]
+
+
+@pytest.mark.parametrize("backend", ["dict", "columnar"])
+@pytest.mark.parametrize("low_watermark", [None, 15])
+@pytest.mark.parametrize("seed", range(5))
+def test_heap_eviction_matches_scan(backend, low_watermark, seed):
+    ops = random_ops(seed)
+    scan = run(UtilityWeightedMemory(20, low_watermark=low_watermark, backend=backend), ops)
+    heap = run(UtilityWeightedMemory(20, low_watermark=low_watermark, backend=backend, eviction="heap"), ops)
+    assert heap == scan
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_columnar_eviction_matches_dict(seed):
+    ops = random_ops(seed)
+    assert run(UtilityWeightedMemory(20, backend="columnar"), ops) == run(UtilityWeightedMemory(20), ops)
+
+
+def test_underflowed_scores_still_rank_by_utility():
+    for eviction in ("scan", "heap"):
+        memory = UtilityWeightedMemory(2, eviction=eviction)
+        memory.add({"content": "a", "timestamp": START, "impact": 1.0})
+        memory.add({"content": "b", "timestamp": START + 5, "impact": 0.1})
+        memory.add({"content": "c", "timestamp": START + 86400, "impact": 0.5})
+        assert [m["content"] for m in memory.memories.values()] == ["a", "c"]
+
+
+@pytest.mark.parametrize("backend", ["dict", "columnar"])
+@pytest.mark.parametrize("seed", range(5))
+def test_add_many_matches_sequential_add(backend, seed):
+    rng = random.Random(seed)
+    batched, sequential = UtilityWeightedMemory(20, backend=backend), UtilityWeightedMemory(20, backend=backend)
+    now = START
+    for _ in range(40):
+        batch = []
+        for _ in range(rng.randint(1, 30)):
+            now += rng.choice(GAPS)
+            batch.append({"content": f"item {now}", "timestamp": now, "impact": rng.choice([0.0, 0.1, 0.5, 1.0])})
+        batched.add_many([dict(item) for item in batch])
+        for item in batch:
+            sequential.add(dict(item))
+        query = f"item {rng.choice(batch)['timestamp']}"[:8]
+        assert ([m["content"] for m in batched.retrieve(query, top_k=3, current_time=now)]
+                == [m["content"] for m in sequential.retrieve(query, top_k=3, current_time=now)])
+        assert list(batched.memories) == list(sequential.memories)
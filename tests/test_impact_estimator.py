@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from agent.impact_estimator import CRITICAL_KEYWORDS, CONFIG_KEYWORDS, ACTION_KEYWORDS, get_estimator
+
+WORDS = ["user", "logged", "in", "key", "retry", "of", "latency", "bob", "x", "ms", "fbil", "5fail",
+         "warning", "info", "fatal"] + list(CRITICAL_KEYWORDS + CONFIG_KEYWORDS + ACTION_KEYWORDS)
+
+
+def random_line(rng):
+    parts = []
+    for _ in range(rng.randint(1, 8)):
+        kind = rng.random()
+        word = rng.choice(WORDS)
+        if kind < 0.2:
+            parts.append(f"'{word}'")
+        elif kind < 0.35:
+            parts.append(f"{rng.randrange(1000)}{rng.choice(['', 'ms', word])}")
+        elif kind < 0.45:
+            parts.append(f"{rng.choice('abcdef')}{rng.randrange(100)}{word}")
+        else:
+            parts.append(word.upper() if rng.random() < 0.2 else word)
+    return " ".join(parts)
+
+
+@pytest.mark.parametrize("name", ["rule", "severity", "tfidf", "combined"])
+def test_memoized_scores_match_unwrapped(name):
+    rng = random.Random(0)
+    estimator = get_estimator(name)
+    memoized = get_estimator(name, memoize=True)
+    lines = [random_line(rng) for _ in range(3000)]
+    lines += ["User 'secret' logged in", "User 'bob' logged in",
+              "Config key 'password' updated", "Config key 'name' updated", "5fail", "5fbil"]
+    for line in lines:
+        assert memoized(line) == estimator(line), line
+    assert memoized.hits > 0
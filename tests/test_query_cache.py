@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from memory.fifo_memory import FIFOMemory
+from memory.lru_memory import LRUMemory
+from memory.query_cache import QueryCache
+from memory.utility_weighted_memory import UtilityWeightedMemory
+
+QUERIES = ["item 1", "item 2", "tem 3", "x", "item 12", "It", "zz"]
+
+MEMORIES = [
+    (UtilityWeightedMemory, {}),
+    (UtilityWeightedMemory, {"backend": "columnar"}),
+    (UtilityWeightedMemory, {"eviction": "heap"}),
+    (UtilityWeightedMemory, {"access_policy": "returned"}),
+    (UtilityWeightedMemory, {"low_watermark": 80}),
+    (UtilityWeightedMemory, {"use_index": True}),
+    (FIFOMemory, {}),
+    (FIFOMemory, {"low_watermark": 80}),
+    (FIFOMemory, {"use_index": True}),
+    (LRUMemory, {}),
+    (LRUMemory, {"low_watermark": 80}),
+    (LRUMemory, {"use_index": True}),
+]
+
+
+def run(memory, seed):
+    rng = random.Random(seed)
+    results = []
+    for t in range(1500):
+        memory.add({"content": f"Item {rng.randint(0, 300)}", "timestamp": t,
+                    "impact": rng.choice([0, 0.1, 0.5, 1.0])})
+        for _ in range(rng.randint(0, 3)):
+            retrieved = memory.retrieve(rng.choice(QUERIES), top_k=rng.choice([1, 3, -1]), current_time=t)
+            results.append([(r["content"], r["timestamp"], r["access_count"] if "access_count" in r else None)
+                            for r in retrieved])
+    return results
+
+
+@pytest.mark.parametrize("cls, kwargs", MEMORIES, ids=lambda p: p.__name__ if isinstance(p, type) else str(p))
+def test_cached_retrieve_matches_uncached(cls, kwargs):
+    # A small cache and log force evictions and full invalidations too
+    cached = cls(100, query_cache=QueryCache(max_entries=4, max_log=50), **kwargs)
+    assert run(cached, 5) == run(cls(100, **kwargs), 5)
+    assert cached.stats()["query_cache"]["patched"] > 0
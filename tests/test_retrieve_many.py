@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from memory.concurrent_memory import ConcurrentMemory
+from memory.fifo_memory import FIFOMemory
+from memory.lru_memory import LRUMemory
+from memory.multi_match import MultiMatcher
+from memory.utility_weighted_memory import UtilityWeightedMemory
+
+WORDS = ["database", "latency", "retry", "root", "admin", "x", "y", "bin", "blob", "\x00", "Ab"]
+
+MEMORIES = {
+    "fifo": lambda: FIFOMemory(40),
+    "lru": lambda: LRUMemory(40),
+    "uwm": lambda: UtilityWeightedMemory(40),
+    "uwm-columnar": lambda: UtilityWeightedMemory(40, backend="columnar"),
+    "uwm-returned": lambda: UtilityWeightedMemory(40, eviction="heap", access_policy="returned"),
+}
+
+
+def random_text(rng):
+    return "".join(rng.choice(WORDS) + rng.choice(["", " ", "\x00"]) for _ in range(rng.randint(1, 4)))
+
+
+def contents(results):
+    return [[r["content"] for r in result] for result in results]
+
+
+def test_multi_matcher_matches_each_text():
+    rng = random.Random(0)
+    for _ in range(300):
+        texts = [random_text(rng).lower() for _ in range(rng.randint(0, 8))]
+        patterns = [random_text(rng).lower()[:rng.randint(0, 4)] for _ in range(4)]
+        keys = list(range(len(texts)))
+        expected = [[k for k, text in zip(keys, texts) if p in text] for p in patterns]
+        assert MultiMatcher(patterns).match(keys, texts) == expected
+
+
+@pytest.mark.parametrize("name", list(MEMORIES))
+def test_retrieve_many_matches_sequential_retrieve(name):
+    rng = random.Random(1)
+    batched, sequential = MEMORIES[name](), MEMORIES[name]()
+    for t in range(200):
+        item = {"content": random_text(rng), "timestamp": float(t), "impact": rng.random()}
+        batched.add(dict(item))
+        sequential.add(dict(item))
+        if t % 5 == 0:
+            queries = [random_text(rng)[:rng.randint(1, 6)] for _ in range(rng.randint(1, 4))]
+            top_k = rng.randint(1, 3)
+            expected = [sequential.retrieve(q, top_k=top_k, current_time=t + 0.5) for q in queries]
+            assert contents(batched.retrieve_many(queries, top_k=top_k, current_time=t + 0.5)) == contents(expected)
+
+
+def test_concurrent_memory_matches_wrapped_memory():
+    rng = random.Random(2)
+    wrapped = UtilityWeightedMemory(40)
+    concurrent = ConcurrentMemory(UtilityWeightedMemory(40), publish_every=1, apply_interval=60)
+    try:
+        for t in range(200):
+            item = {"content": random_text(rng), "timestamp": float(t), "impact": rng.random()}
+            wrapped.add(dict(item))
+            concurrent.add(dict(item))
+            if t % 5 == 0:
+                # Accesses are applied on flush(), so compare query by query
+                query = random_text(rng)[:rng.randint(1, 6)]
+                expected = wrapped.retrieve(query, top_k=2, current_time=float(t))
+                assert contents([concurrent.retrieve(query, top_k=2, current_time=float(t))]) == contents([expected])
+                concurrent.flush()
+    finally:
+        concurrent.close()
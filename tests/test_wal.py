@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from memory.fifo_memory import FIFOMemory
+from memory.lru_memory import LRUMemory
+from memory.query_cache import QueryCache
+from memory.similarity_memory import SimilarityOnlyMemory
+from memory.utility_weighted_memory import UtilityWeightedMemory
+from memory.wal import WriteAheadLog
+
+WORDS = "error disk root login latency config user alert ok log".split()
+
+MEMORIES = {
+    "fifo": lambda: FIFOMemory(60),
+    "fifo-index": lambda: FIFOMemory(60, use_index=True),
+    "lru": lambda: LRUMemory(60),
+    "lru-watermark": lambda: LRUMemory(60, low_watermark=45),
+    "uwm": lambda: UtilityWeightedMemory(60),
+    "uwm-heap-columnar": lambda: UtilityWeightedMemory(60, eviction="heap", backend="columnar"),
+    "uwm-sampled-returned": lambda: UtilityWeightedMemory(60, eviction="sampled", access_policy="returned"),
+    "uwm-watermark-cache": lambda: UtilityWeightedMemory(60, low_watermark=40, query_cache=QueryCache()),
+}
+
+
+def run(memory, seed, count, start=0):
+    rng = random.Random(seed)
+    for i in range(start, start + count):
+        words = " ".join(rng.choice(WORDS) for _ in range(3))
+        memory.add({"content": f"{words} {rng.randrange(50)}", "timestamp": i, "impact": rng.random()})
+        if rng.random() < 0.3:
+            memory.retrieve(rng.choice(WORDS), top_k=3, current_time=i + 0.5)
+        if rng.random() < 0.02:
+            memory.add_many([{"content": f"b {rng.choice(WORDS)} {j}", "timestamp": i + 0.7, "impact": rng.random()}
+                             for j in range(rng.randrange(1, 8))])
+
+
+def state(memory):
+    if isinstance(memory, UtilityWeightedMemory):
+        return [(i, dict(m)) for i, m in memory.memories.items()], memory._next_id
+    if isinstance(memory, LRUMemory):
+        return [dict(m) for m in memory.cache.values()]
+    return [dict(m) for m in memory.buffer]
+
+
+@pytest.mark.parametrize("name", list(MEMORIES))
+def test_recover_matches_live_memory(name, tmp_path):
+    make = MEMORIES[name]
+    log, snapshot = str(tmp_path / "wal.log"), str(tmp_path / "wal.snap")
+    wal = WriteAheadLog(log, group_commit=16)
+    memory = make()
+    wal.attach(memory, snapshot)
+    run(memory, 1, 300)
+    wal.compact(memory, snapshot, background=True)
+    run(memory, 2, 300, start=300)
+    wal.commit()
+
+    # Crash without close(): the snapshot plus the events after it
+    recovered = WriteAheadLog(log).recover(snapshot, make)
+    assert state(recovered) == state(memory)
+    if "sampled" in name:
+        return  # the sampling RNG's position is not logged, so the two diverge from here
+    run(memory, 3, 100, start=600)
+    run(recovered, 3, 100, start=600)
+    assert state(recovered) == state(memory)
+
+
+@pytest.mark.parametrize("name", list(MEMORIES))
+def test_replay_ignores_torn_tail(name, tmp_path):
+    make = MEMORIES[name]
+    log = str(tmp_path / "wal.log")
+    wal = WriteAheadLog(log, group_commit=7)
+    memory = make()
+    wal.attach(memory)
+    run(memory, 4, 300)
+    wal.commit()
+    with open(log, "ab") as f:
+        f.write(b"\x05\x00\x00garbage")
+    assert state(WriteAheadLog(log).recover(str(tmp_path / "missing.snap"), make)) == state(memory)
+
+
+def test_attach_rejects_memories_that_cannot_replay(tmp_path):
+    with pytest.raises(NotImplementedError):
+        WriteAheadLog(str(tmp_path / "wal.log")).attach(SimilarityOnlyMemory(10))